@@ -0,0 +1,319 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+
+class TradeStats:
+    """Running statistics over closed-trade P&L, updated in O(1) per trade.
+
+    Follows the dashboard's conventions: a trade with ``pnl > 0`` is a win
+    and anything else counts as a loss. Mean and variance use Welford's
+    online algorithm. The equity curve is ``capital`` plus cumulative P&L;
+    drawdowns are measured from its high-water mark, in rupees, as a
+    percentage of the peak equity and as time spent below the peak.
+    """
+
+    def __init__(self, capital=0):
+        self.capital = capital
+        self.total_trades = 0
+        self.win_trades = 0
+        self.lose_trades = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.largest_win = 0.0
+        self.largest_loss = 0.0
+        self.consecutive_wins = 0
+        self.consecutive_losses = 0
+        self.max_consecutive_wins = 0
+        self.max_consecutive_losses = 0
+        self.net_pnl = 0.0
+        self.peak_pnl = 0.0
+        self.peak_time = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_pct = 0.0
+        self.max_drawdown_duration = 0.0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._downside_sq = 0.0
+
+    def record(self, pnl, timestamp=None):
+        """Fold one closed trade's P&L (closed at epoch ``timestamp``) into the statistics."""
+        if timestamp is None:
+            timestamp = time.time()
+        if self.peak_time is None:
+            self.peak_time = timestamp
+
+        self.total_trades += 1
+        if pnl > 0:
+            self.win_trades += 1
+            self.gross_profit += pnl
+            self.largest_win = max(self.largest_win, pnl)
+            self.consecutive_wins += 1
+            self.consecutive_losses = 0
+            self.max_consecutive_wins = max(self.max_consecutive_wins, self.consecutive_wins)
+        else:
+            self.lose_trades += 1
+            if pnl < 0:
+                self.gross_loss -= pnl
+                self._downside_sq += pnl * pnl
+            self.largest_loss = min(self.largest_loss, pnl)
+            self.consecutive_losses += 1
+            self.consecutive_wins = 0
+            self.max_consecutive_losses = max(self.max_consecutive_losses, self.consecutive_losses)
+
+        was_underwater = self.net_pnl < self.peak_pnl
+        self.net_pnl += pnl
+        if self.net_pnl >= self.peak_pnl:
+            # A recovery ends the drawdown that started at the previous peak
+            if was_underwater:
+                self.max_drawdown_duration = max(self.max_drawdown_duration, timestamp - self.peak_time)
+            self.peak_pnl = self.net_pnl
+            self.peak_time = timestamp
+        else:
+            self.max_drawdown_duration = max(self.max_drawdown_duration, timestamp - self.peak_time)
+            drawdown = self.peak_pnl - self.net_pnl
+            self.max_drawdown = max(self.max_drawdown, drawdown)
+            peak_equity = self.capital + self.peak_pnl
+            if peak_equity > 0:
+                self.max_drawdown_pct = max(self.max_drawdown_pct, drawdown / peak_equity * 100)
+
+        delta = pnl - self._mean
+        self._mean += delta / self.total_trades
+        self._m2 += delta * (pnl - self._mean)
+
+    @classmethod
+    def from_history(cls, pnls, timestamps, capital=0):
+        """Build the statistics for a series of closed trades in one vectorized pass."""
+        stats = cls(capital)
+        pnl = np.asarray(pnls, dtype=np.float64)
+        ts = np.asarray(timestamps, dtype=np.float64)
+        count = len(pnl)
+        if count == 0:
+            return stats
+
+        wins = pnl > 0
+        losses = pnl < 0
+        stats.total_trades = count
+        stats.win_trades = int(wins.sum())
+        stats.lose_trades = count - stats.win_trades
+        stats.gross_profit = float(pnl[wins].sum())
+        stats.gross_loss = float(-pnl[losses].sum())
+        stats.largest_win = max(0.0, float(pnl.max()))
+        stats.largest_loss = min(0.0, float(pnl.min()))
+
+        # Streaks: lengths of runs of equal win/loss outcome
+        edges = np.flatnonzero(np.diff(wins.astype(np.int8))) + 1
+        starts = np.concatenate(([0], edges))
+        lengths = np.diff(np.concatenate((starts, [count])))
+        run_wins = wins[starts]
+        stats.max_consecutive_wins = int(lengths[run_wins].max(initial=0))
+        stats.max_consecutive_losses = int(lengths[~run_wins].max(initial=0))
+        if run_wins[-1]:
+            stats.consecutive_wins = int(lengths[-1])
+        else:
+            stats.consecutive_losses = int(lengths[-1])
+
+        # Equity curve: peak before each trade, peak after it, drawdown after it
+        cumulative = np.cumsum(pnl)
+        peaks = np.maximum.accumulate(np.concatenate(([0.0], cumulative)))
+        prior_peak, peak = peaks[:-1], peaks[1:]
+        drawdown = peak - cumulative
+        stats.net_pnl = float(cumulative[-1])
+        stats.peak_pnl = float(peak[-1])
+        stats.max_drawdown = float(drawdown.max())
+        peak_equity = capital + peak
+        with np.errstate(divide='ignore', invalid='ignore'):
+            drawdown_pct = np.where(peak_equity > 0, drawdown / peak_equity * 100, 0.0)
+        stats.max_drawdown_pct = float(drawdown_pct.max())
+
+        # Drawdown duration: time since the last new high, while under it or on recovery
+        at_peak = cumulative >= prior_peak
+        peak_index = np.maximum.accumulate(np.where(at_peak, np.arange(count), -1))
+        peak_times = np.where(peak_index >= 0, ts[np.maximum(peak_index, 0)], ts[0])
+        last_peak_times = np.concatenate(([ts[0]], peak_times[:-1]))
+        underwater_before = np.concatenate(([False], ~at_peak[:-1]))
+        durations = np.where(~at_peak | underwater_before, ts - last_peak_times, 0.0)
+        stats.max_drawdown_duration = float(durations.max())
+        stats.peak_time = float(peak_times[-1])
+
+        stats._mean = float(pnl.mean())
+        stats._m2 = float(((pnl - stats._mean) ** 2).sum())
+        stats._downside_sq = float((pnl[losses] ** 2).sum())
+        return stats
+
+    @property
+    def avg_profit_per_trade(self):
+        return self.gross_profit / self.win_trades if self.win_trades else 0
+
+    @property
+    def avg_loss_per_trade(self):
+        return -self.gross_loss / self.lose_trades if self.gross_loss else 0
+
+    @property
+    def profit_factor(self):
+        return self.gross_profit / self.gross_loss if self.gross_loss > 0 else 0
+
+    @property
+    def win_rate(self):
+        return self.win_trades / self.total_trades * 100 if self.total_trades else 0
+
+    @property
+    def mean_pnl(self):
+        return self._mean
+
+    @property
+    def stdev_pnl(self):
+        """Sample standard deviation of per-trade P&L."""
+        return math.sqrt(self._m2 / (self.total_trades - 1)) if self.total_trades > 1 else 0
+
+    @property
+    def sharpe_ratio(self):
+        """Per-trade Sharpe ratio (mean over sample deviation, zero risk-free rate)."""
+        stdev = self.stdev_pnl
+        return self._mean / stdev if stdev > 0 else 0
+
+    @property
+    def sortino_ratio(self):
+        """Per-trade Sortino ratio (mean over downside deviation below zero)."""
+        if not self.total_trades or self._downside_sq <= 0:
+            return 0
+        return self._mean / math.sqrt(self._downside_sq / self.total_trades)
+
+    @property
+    def current_drawdown(self):
+        return self.peak_pnl - self.net_pnl
+
+    def stats_fields(self):
+        """Values for the trade-derived keys of the ``ce_stats``/``pe_stats`` dicts."""
+        return {
+            'total_trades': self.total_trades,
+            'win_trades': self.win_trades,
+            'lose_trades': self.lose_trades,
+            'max_profit': self.largest_win,
+            'max_loss': self.largest_loss,
+            'largest_winning_trade': self.largest_win,
+            'largest_losing_trade': self.largest_loss,
+            'consecutive_wins': self.consecutive_wins,
+            'consecutive_losses': self.consecutive_losses,
+            'avg_profit_per_trade': self.avg_profit_per_trade,
+            'avg_loss_per_trade': self.avg_loss_per_trade,
+            'profit_factor': self.profit_factor
+        }
+
+    def risk_metrics(self):
+        """Equity-curve and risk-adjusted return figures for the analytics routes."""
+        return {
+            'total_trades': self.total_trades,
+            'net_pnl': round(self.net_pnl, 2),
+            'peak_pnl': round(self.peak_pnl, 2),
+            'current_drawdown': round(self.current_drawdown, 2),
+            'max_drawdown': round(self.max_drawdown, 2),
+            'max_drawdown_pct': round(self.max_drawdown_pct, 2),
+            'max_drawdown_duration': round(self.max_drawdown_duration, 1),
+            'sharpe_ratio': round(self.sharpe_ratio, 4),
+            'sortino_ratio': round(self.sortino_ratio, 4)
+        }
+
+
+def lttb_indices(values, threshold):
+    """Indices kept by Largest-Triangle-Three-Buckets downsampling of ``values``.
+
+    Points are treated as evenly spaced on the x axis. The first and last
+    points are always kept; ``threshold`` below 3 or at least ``len(values)``
+    keeps everything.
+    """
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(range(count))
+
+    kept = [0]
+    bucket_size = (count - 2) / (threshold - 2)
+    previous = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        # Average of the next bucket (or the last point) is the third vertex
+        next_start, next_end = end, min(int((bucket + 2) * bucket_size) + 1, count)
+        if next_start >= next_end:
+            next_start, next_end = count - 1, count
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+
+        best, best_area = start, -1.0
+        px, py = previous, values[previous]
+        for index in range(start, end):
+            area = abs((px - avg_x) * (values[index] - py) - (px - index) * (avg_y - py))
+            if area > best_area:
+                best, best_area = index, area
+        kept.append(best)
+        previous = best
+    kept.append(count - 1)
+    return kept
+
+
+class PnlSeries:
+    """Cumulative P&L chart points, appended once per closed trade.
+
+    Every point carries an increasing ``seq`` so clients can ask only for the
+    points after the last one they have.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._points = []
+        self._first_seq = 1
+        self._cumulative = 0.0
+        self.series_id = self._new_series_id()
+
+    def _new_series_id(self):
+        return f"{int(time.time() * 1000):x}-{self._first_seq}"
+
+    @property
+    def last_seq(self):
+        with self._lock:
+            return self._first_seq + len(self._points) - 1
+
+    def append(self, exit_time, pnl, scrip_type):
+        with self._lock:
+            self._cumulative += pnl
+            point = {
+                'seq': self._first_seq + len(self._points),
+                'time': exit_time,
+                'pnl': pnl,
+                'cumulative_pnl': self._cumulative,
+                'scrip_type': scrip_type
+            }
+            self._points.append(point)
+            return point
+
+    def reset(self, points=()):
+        """Start a new series (sequence numbers keep increasing) from ``(time, pnl, scrip_type)``."""
+        with self._lock:
+            self._first_seq += len(self._points)
+            self._points = []
+            self._cumulative = 0.0
+            self.series_id = self._new_series_id()
+        for exit_time, pnl, scrip_type in points:
+            self.append(exit_time, pnl, scrip_type)
+
+    def since(self, seq=0, series_id=None, max_points=None):
+        """Return ``(points, last_seq, reset)`` for points after ``seq``.
+
+        ``reset`` is True when ``seq``/``series_id`` belong to a different
+        series (e.g. before a restart) and the full series is returned
+        instead. A full series is downsampled with LTTB to ``max_points``
+        when given.
+        """
+        with self._lock:
+            last_seq = self._first_seq + len(self._points) - 1
+            reset = seq > 0 and (series_id != self.series_id or seq > last_seq)
+            if reset or seq <= 0:
+                points = list(self._points)
+            else:
+                points = self._points[seq - self._first_seq + 1:]
+        if max_points and (reset or seq <= 0):
+            keep = lttb_indices([p['cumulative_pnl'] for p in points], max_points)
+            points = [points[i] for i in keep]
+        return points, last_seq, reset
@@ -1,19 +1,33 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+from flask import Flask, render_template, request, jsonify, redirect, url_for, Response
+import io
+import asyncio
 import json
 import threading
 import time
 from datetime import datetime, timedelta, date
 import pandas as pd
-from collections import deque
+import numpy as np
+from bisect import bisect_right
+from collections import deque, namedtuple
+from types import MappingProxyType
 import os
 import logging
 from typing import Optional, Dict, Any
 import requests
 import math, csv
 import sys
+import httpclient
+from iocore import IOCore
 import pandas as pd
 import webbrowser
-from scripupdate import generate_scripmaster_csv
+from scripupdate import generate_scripmaster_csv, last_run_timings, cache_status
+from indicators import SMMAEngine, RollingExtremes, calculate_smma
+from pricehistory import PriceHistory
+from scheduler import TickScheduler
+from analytics import TradeStats, PnlSeries
+from versioning import Revisions, SnapshotStore
+from eventbus import EventBus, SubscriberLimitReached
+from orderjournal import OrderJournal, TradeHistoryIndex
 from sastoken import sasonline_oauth_login, get_oauth_authorization_url, exchange_code_for_token, generate_totp
 from requests_oauthlib import OAuth2Session
 
@@ -88,8 +102,9 @@ def sas_oauth_callback():
 access_token = None
 
 # Trading data
-price_history_ce = deque(maxlen=600)
-price_history_pe = deque(maxlen=600)
+PRICE_HISTORY_CAPACITY = int(os.environ.get('PRICE_HISTORY_CAPACITY', 600))
+price_history_ce = PriceHistory(PRICE_HISTORY_CAPACITY)
+price_history_pe = PriceHistory(PRICE_HISTORY_CAPACITY)
 trading_active = False
 current_position_ce = None
 current_position_pe = None
@@ -107,6 +122,7 @@ scrip_update_in_progress = False
 trading_paused = False
 last_price_check = 0
 scripmaster_df = None
+scrip_index = None
 
 # Configuration dictionary
 config = {
@@ -127,11 +143,34 @@ config = {
     'auto_scrip_update': 'enabled',
     'price_difference_threshold': 40.0,
     'strategy_range': 8,
-    'main_time_period': 300
+    'main_time_period': 300,
+    # Seconds between market data ticks; indicator periods are in seconds
+    # and map to round(period / tick_interval) price samples
+    'tick_interval': float(os.environ.get('TICK_INTERVAL', 1.0))
 }
 
 VALID_EXCHANGES = ['N', 'B', 'M']
 
+# Shortest tick interval accepted; faster ticks only burn MarketFeed quota
+MIN_TICK_INTERVAL = 0.25
+
+
+def normalize_tick_interval(value):
+    """``value`` as a tick interval clamped to MIN_TICK_INTERVAL; None if not a positive finite number."""
+    try:
+        interval = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(interval) or interval <= 0:
+        return None
+    return max(interval, MIN_TICK_INTERVAL)
+
+
+_tick_interval = normalize_tick_interval(config['tick_interval'])
+if _tick_interval is None:
+    logger.warning(f"Invalid TICK_INTERVAL {config['tick_interval']}; using 1.0")
+config['tick_interval'] = _tick_interval or 1.0
+
 # Real-time statistics for CE
 ce_stats = {
     'current_price': 0,
@@ -157,7 +196,8 @@ ce_stats = {
     'range_percent': 0,
     'time_period': 0,
     'high': 0,
-    'low': 0
+    'low': 0,
+    'quantity': 0  # Size of the open position, 0 when flat
 }
 
 # Real-time statistics for PE
@@ -185,7 +225,8 @@ pe_stats = {
     'range_percent': 0,
     'time_period': 0,
     'high': 0,
-    'low': 0
+    'low': 0,
+    'quantity': 0  # Size of the open position, 0 when flat
 }
 
 # Portfolio tracking
@@ -200,58 +241,145 @@ portfolio_data = {
     'roi': 0,
     'positions': []
 }
+# Guards portfolio_data and the other state both leg workers update
+# (combined trade statistics, daily trade count)
+portfolio_lock = threading.RLock()
+
+# Revision counters for the collections the dashboard polls (orders, trades,
+# alerts, stats, market, config); responses carry them as ETags
+state_revisions = Revisions()
+
+# Push channel for /api/stream (ticks, orders, trades, alerts, scrip updates).
+# Every stream pins one server thread (gunicorn runs 16), so streams are capped
+# well below that to leave threads for ordinary requests
+SSE_MAX_SUBSCRIBERS = int(os.environ.get('SSE_MAX_SUBSCRIBERS', 8))
+event_bus = EventBus(max_subscribers=SSE_MAX_SUBSCRIBERS)
+
+
+def record_order(orders, order):
+    """Append an executed order, tagging it with the new 'orders' revision."""
+    order['seq'] = state_revisions.bump('orders')
+    orders.append(order)
+    event_bus.publish('order', order)
+
+
+def record_trade(trades, trade):
+    """Append a closed trade, tagging it with the new 'trades' revision."""
+    trade['seq'] = state_revisions.bump('trades')
+    trades.append(trade)
+    event_bus.publish('trade', trade)
+
+
+# Order journal (order_history.csv is imported into it once and kept as an export format)
+ORDER_JOURNAL_PATH = os.environ.get('ORDER_JOURNAL_PATH', 'order_journal.db')
+order_journal = OrderJournal(
+    ORDER_JOURNAL_PATH,
+    legacy_csv='order_history.csv',
+    synchronous=os.environ.get('ORDER_JOURNAL_SYNC', 'NORMAL')
+)
+# Loaded once; every new order is added as it is journalled
+trade_history_index = TradeHistoryIndex(order_journal.rows())
+
+
+def write_order_to_csv(scrip_name, scrip_type, qty, price, pnl=0):
+    """Append an executed order to the order journal and the trade-history index."""
+    record = order_journal.append(scrip_name, scrip_type, qty, price, pnl)
+    trade_history_index.add(record)
+    return record
+
+MARKET_FEED_URL = "https://Openapi.5paisa.com/VendorsAPI/Service1.svc/V1/MarketFeed"
+MARKET_FEED_USER_KEY = "Q4O7AsAK0iUABwjsvYfmfNU1cMiMWXai"
+MARKET_FEED_BATCH_LIMIT = 50  # Vendor limit on MarketFeedData entries per request
+MARKET_FEED_TIMEOUT = 15  # Seconds for one MarketFeed call, client retries included
+ORDER_URL = "https://api.stocko.in/api/v1/orders"
+# Longer than the orders client's connect + read timeouts, so a request that
+# may have reached the broker is normally answered rather than abandoned
+ORDER_TIMEOUT = 20
+
+# Broker and market-feed I/O runs on one asyncio loop thread; concurrent
+# requests per host are capped at that client's connection pool size
+io_core = IOCore({name: client.pool_maxsize for name, client in httpclient.CLIENTS.items()})
 
 
-def write_order_to_csv(filename, scrip_name, scrip_type, qty, price, pnl=0):
-    value = qty * price
-    now = datetime.now()
-    date_str = now.strftime("%Y-%m-%d")
-    time_str = now.strftime("%H:%M:%S")
-    with open(filename, "a", newline='') as file:
-        writer = csv.writer(file)
-        # Optionally write header if file is empty
-        if file.tell() == 0:
-            writer.writerow(['Date', 'Time', 'Scrip Name', 'Scrip Type', 'Quantity', 'Price', 'Value', 'PNL'])
-        writer.writerow([date_str, time_str, scrip_name, scrip_type, qty, price, value, pnl])
-
 def get_ltp(scrip_data):
-    url = "https://Openapi.5paisa.com/VendorsAPI/Service1.svc/V1/MarketFeed"
-    USER_KEY = "Q4O7AsAK0iUABwjsvYfmfNU1cMiMWXai"
-    
-    if config['exchange'] not in VALID_EXCHANGES:
-        logging.error(f"Invalid exchange: {config['exchange']}")
-        alert_manager.add_alert('error', 'Invalid Exchange', f"Exchange {config['exchange']} is not valid", 'error')
-        return None
-    
+    """Fetch LTP for a single scrip."""
+    return get_ltps([scrip_data]).get(scrip_data)
+
+
+def get_ltps(scrip_codes, exch=None):
+    """Blocking wrapper around ``fetch_ltps`` for the engine and Flask routes."""
+    return io_core.run(fetch_ltps(scrip_codes, exch))
+
+
+async def fetch_ltps(scrip_codes, exch=None):
+    """Fetch LTPs for several scrips, one MarketFeed call per batch of codes.
+
+    Batches are requested concurrently (bounded by the market-data host limit
+    and the shared MarketFeed rate limiter). Returns a dict mapping each
+    requested code to its LTP (None when missing).
+    """
+    exch = exch or config['exchange']
+    codes = list(dict.fromkeys(code for code in scrip_codes if code))
+    ltps = {code: None for code in codes}
+
+    if exch not in VALID_EXCHANGES:
+        logging.error(f"Invalid exchange: {exch}")
+        alert_manager.add_alert('error', 'Invalid Exchange', f"Exchange {exch} is not valid", 'error')
+        return ltps
+
+    batches = [codes[start:start + MARKET_FEED_BATCH_LIMIT] for start in range(0, len(codes), MARKET_FEED_BATCH_LIMIT)]
+    for batch_ltps in await asyncio.gather(*(_fetch_ltp_batch(batch, exch) for batch in batches)):
+        ltps.update(batch_ltps)
+    return ltps
+
+
+async def _fetch_ltp_batch(batch, exch):
+    """Fetch LTPs for at most MARKET_FEED_BATCH_LIMIT codes with a single MarketFeed request."""
+    ltps = {}
     payload = {
-        "head": {"key": USER_KEY},
+        "head": {"key": MARKET_FEED_USER_KEY},
         "body": {
             "MarketFeedData": [
-                {"Exch": config['exchange'], "ExchType": "D", "ScripCode": scrip_data, "ScripData": scrip_data}
+                {"Exch": exch, "ExchType": "D", "ScripCode": code, "ScripData": code}
+                for code in batch
             ],
             "LastRequestTime": "/Date(0)/",
             "RefreshRate": "H"
         }
     }
     try:
-        response = requests.post(url, headers={"Content-Type": "application/json"}, data=json.dumps(payload))
+        await httpclient.market_feed_limiter.acquire_async()
+        response = await io_core.request(
+            httpclient.market_data, 'POST', MARKET_FEED_URL, timeout=MARKET_FEED_TIMEOUT,
+            headers={"Content-Type": "application/json"}, data=json.dumps(payload)
+        )
         if response.status_code != 200:
             raise Exception(f"API request failed with status {response.status_code}")
         data = response.json()
-        if "body" in data and "Data" in data["body"] and len(data["body"]["Data"]) > 0:
-            market_data = data["body"]["Data"][0]
-            return market_data.get("LastRate", None)
-        return None
+        rows = data.get("body", {}).get("Data") or []
+
+        # Match rows back to requested codes by Token only; the feed may drop or
+        # reorder rows, so codes without a matching row stay None
+        by_token = {str(code): code for code in batch}
+        for market_data in rows:
+            code = by_token.get(str(market_data.get("Token")))
+            if code is not None:
+                ltps[code] = market_data.get("LastRate", None)
     except Exception as error:
-        logging.error(f"Error fetching LTP: {error}")
-        alert_manager.add_alert('error', 'LTP Fetch Error', f"Failed to fetch LTP: {str(error)}", 'error')
-        return None
+        logging.error(f"Error fetching LTP for {batch}: {error!r}")
+        alert_manager.add_alert('error', 'LTP Fetch Error', f"Failed to fetch LTP: {str(error) or type(error).__name__}", 'error',
+                                scrip=','.join(str(code) for code in batch))
+    return ltps
+
+
 def get_index_ltp(scrip_data, exchange):
-    url = "https://Openapi.5paisa.com/VendorsAPI/Service1.svc/V1/MarketFeed"
-    USER_KEY = "Q4O7AsAK0iUABwjsvYfmfNU1cMiMWXai"
-    
+    """Blocking wrapper around ``fetch_index_ltp``."""
+    return io_core.run(fetch_index_ltp(scrip_data, exchange))
+
+
+async def fetch_index_ltp(scrip_data, exchange):
     payload = {
-        "head": {"key": USER_KEY},
+        "head": {"key": MARKET_FEED_USER_KEY},
         "body": {
             "MarketFeedData": [
                 {"Exch": exchange, "ExchType": "C", "ScripCode": scrip_data, "ScripData": scrip_data}
@@ -262,8 +390,9 @@ def get_index_ltp(scrip_data, exchange):
     }
     
     try:
-        response = requests.post(
-            url,
+        await httpclient.market_feed_limiter.acquire_async()
+        response = await io_core.request(
+            httpclient.market_data, 'POST', MARKET_FEED_URL, timeout=MARKET_FEED_TIMEOUT,
             headers={"Content-Type": "application/json"},
             data=json.dumps(payload)
         )
@@ -289,6 +418,9 @@ def get_index_ltp(scrip_data, exchange):
     except requests.exceptions.RequestException as req_err:
         logging.error(f"Request error occurred: {req_err}")
         return None
+    except asyncio.TimeoutError:
+        logging.error(f"Timed out fetching index LTP for {scrip_data} on {exchange}")
+        return None
     except ValueError as json_err:
         logging.error(f"JSON decode error: {json_err}")
         return None
@@ -298,54 +430,13 @@ def get_index_ltp(scrip_data, exchange):
 
 # --- Order Placement Functions ---
 def Buy_place_order(instrument_token, quantity, exchange):
-
-    # Use global access_token variable instead of reading from file
-    global access_token
-    if not access_token:
-        logging.error("Error: access_token not available.")
-        return False
-
-    if exchange == "N":
-        exchange_order = "NFO"
-    else :
-        exchange_order = "BFO"
-
-    url = "https://api.stocko.in/api/v1/orders"
-    order_data = {
-        "exchange": exchange_order,
-        "order_type": "MARKET",
-        "instrument_token": instrument_token,
-        "quantity": quantity,
-        "disclosed_quantity": 0,
-        "price": 0,
-        "order_side": "BUY",
-        "trigger_price": 0,
-        "validity": "DAY",
-        "product": "MIS",
-        "client_id": "DA251",
-        "user_order_id": 10002,
-        "market_protection_percentage": 0,
-        "device": "WEB"
-    }
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {access_token}"
-    }
-    try:
-        response = requests.post(url, headers=headers, data=json.dumps(order_data))
-        if response.status_code == 200:
-            logging.info("BUY order placed successfully!")
-            logging.info(f"Response: {response.json()}")
-            return True
-        else:
-            logging.error(f"Failed to place BUY order. Status code: {response.status_code}")
-            logging.error(f"Response: {response.text}")
-            return False
-    except requests.exceptions.RequestException as e:
-        logging.error(f"An error occurred while placing BUY order: {e}")
-        return False
+    return io_core.run(place_order('BUY', instrument_token, quantity, exchange))
 
 def Sell_place_order(instrument_token, quantity, exchange):
+    return io_core.run(place_order('SELL', instrument_token, quantity, exchange))
+
+async def place_order(side, instrument_token, quantity, exchange):
+    """Place a market order; True when the broker accepted it."""
 
     # Use global access_token variable instead of reading from file
     global access_token
@@ -358,7 +449,6 @@ def Sell_place_order(instrument_token, quantity, exchange):
     else :
         exchange_order = "BFO"
 
-    url = "https://api.stocko.in/api/v1/orders"
     order_data = {
         "exchange": exchange_order,
         "order_type": "MARKET",
@@ -366,7 +456,7 @@ def Sell_place_order(instrument_token, quantity, exchange):
         "quantity": quantity,
         "disclosed_quantity": 0,
         "price": 0,
-        "order_side": "SELL",
+        "order_side": side,
         "trigger_price": 0,
         "validity": "DAY",
         "product": "MIS",
@@ -380,17 +470,24 @@ def Sell_place_order(instrument_token, quantity, exchange):
         "Authorization": f"Bearer {access_token}"
     }
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(order_data))
+        response = await io_core.request(
+            httpclient.orders, 'POST', ORDER_URL, timeout=ORDER_TIMEOUT,
+            headers=headers, data=json.dumps(order_data)
+        )
         if response.status_code == 200:
-            logging.info("SELL order placed successfully!")
+            logging.info(f"{side} order placed successfully!")
             logging.info(f"Response: {response.json()}")
             return True
         else:
-            logging.error(f"Failed to place SELL order. Status code: {response.status_code}")
+            logging.error(f"Failed to place {side} order. Status code: {response.status_code}")
             logging.error(f"Response: {response.text}")
             return False
     except requests.exceptions.RequestException as e:
-        logging.error(f"An error occurred while placing SELL order: {e}")
+        logging.error(f"An error occurred while placing {side} order: {e}")
+        return False
+    except asyncio.TimeoutError:
+        # The request may still have reached the broker; check the order book
+        logging.error(f"{side} order for {instrument_token} timed out after {ORDER_TIMEOUT}s; status unknown")
         return False
 
 # ============================================================================
@@ -406,9 +503,74 @@ def get_dynamic_password(name="dhaval"):
     return f"{day}{hour}{name}{month}"
 
 
+class ScripMasterIndex:
+    """Lookup tables over the scrip master, built once per load.
+
+    - ``by_code``: ScripCode -> row, for O(1) name lookups
+    - ``expiries``: Exch -> sorted option expiries
+    - ``options``: (Exch, Expiry, ScripType) -> option items sorted by strike
+    """
+
+    def __init__(self, df):
+        self.by_code = {}
+        self.expiries = {}
+        self.options = {}
+
+        for row in df.to_dict('records'):
+            code = int(row['ScripCode'])
+            self.by_code[code] = row
+
+            scrip_type = row.get('ScripType')
+            if scrip_type not in ('CE', 'PE'):
+                continue
+
+            exch = row.get('Exch')
+            expiry = str(row.get('Expiry'))[:10]  # in case timestamps are present
+            strike = float(row['StrikeRate']) if not pd.isna(row.get('StrikeRate')) else None
+            lot_size = row.get('LotSize')
+            item = {
+                'scrip_code': code,
+                'name': str(row.get('Name', 'Unknown')),
+                'strike': strike,
+                'lot_size': int(lot_size) if not pd.isna(lot_size) else None,
+                'scrip_type': scrip_type
+            }
+            self.expiries.setdefault(exch, set()).add(expiry)
+            self.options.setdefault((exch, expiry, scrip_type), []).append(item)
+
+        self.expiries = {exch: sorted(values) for exch, values in self.expiries.items()}
+        for items in self.options.values():
+            items.sort(key=lambda x: (x['strike'] is None, x['strike']))
+
+    def name(self, scrip_code):
+        row = self.by_code.get(int(scrip_code))
+        return row.get('Name', 'Unknown') if row is not None else "Unknown"
+
+    def expiry_list(self, exch=None):
+        """Sorted option expiries for ``exch``, or across all exchanges when None."""
+        if exch is not None:
+            return list(self.expiries.get(exch, []))
+        return sorted(set().union(*self.expiries.values()))
+
+    def option_list(self, scrip_type, exch=None, expiry=None):
+        """Options of ``scrip_type`` sorted by strike; None for exch/expiry matches any."""
+        if exch is not None and expiry is not None:
+            return list(self.options.get((exch, expiry, scrip_type), []))
+        items = [
+            item
+            for (item_exch, item_expiry, item_type), group in self.options.items()
+            if item_type == scrip_type
+            and (exch is None or item_exch == exch)
+            and (expiry is None or item_expiry == expiry)
+            for item in group
+        ]
+        items.sort(key=lambda x: (x['strike'] is None, x['strike']))
+        return items
+
+
 def load_scrip_master_from_csv(file_path):
-    """Load scrip master data from CSV file."""
-    global scripmaster_df
+    """Load scrip master data from CSV file and build its lookup index."""
+    global scripmaster_df, scrip_index
     
     try:
         if os.path.exists(file_path):
@@ -417,6 +579,7 @@ def load_scrip_master_from_csv(file_path):
             scripmaster_df['ScripCode'] = pd.to_numeric(scripmaster_df['ScripCode'], errors='coerce').fillna(0).astype(int)
             # Ensure 'Expiry' column is treated as string for consistent slicing later
             scripmaster_df['Expiry'] = scripmaster_df['Expiry'].astype(str)
+            scrip_index = ScripMasterIndex(scripmaster_df)
             return True
         else:
             logger.error(f"Scrip master file not found at {file_path}")
@@ -427,25 +590,26 @@ def load_scrip_master_from_csv(file_path):
 
 
 def get_scrip_name(scrip_code):
-    """Fetch scrip name from scripmaster_df based on scrip code."""
-    global scripmaster_df
+    """Fetch scrip name from the scrip master index based on scrip code."""
+    global scrip_index
     
     try:
-        if scripmaster_df is None:
+        if scrip_index is None:
             logger.warning("scripmaster_df is not initialized")
             return "Unknown"
         
-        row = scripmaster_df[scripmaster_df['ScripCode'].astype(int) == int(scrip_code)]
-        if not row.empty:
-            return row.iloc[0].get('Name', 'Unknown')
-        return "Unknown"
+        return scrip_index.name(scrip_code)
     except Exception as e:
         logger.error(f"Error fetching scrip name for code {scrip_code}: {str(e)}")
         return "Unknown"
 
 
 def find_nearest_150_scrips():
-    """Find CE and PE scrips with LTP nearest to target."""
+    """Find CE and PE scrips with LTP nearest to target.
+
+    All candidate LTPs for the active exchange are fetched with one batched
+    ``get_ltps`` call instead of one request per scrip.
+    """
     global scripmaster_df, config
     
     try:
@@ -453,43 +617,31 @@ def find_nearest_150_scrips():
             logger.error("scripmaster_df is not initialized or empty.")
             return None, None, None, None
 
-        ce_scrips = scripmaster_df[scripmaster_df['ScripType'] == 'CE']
-        pe_scrips = scripmaster_df[scripmaster_df['ScripType'] == 'PE']
+        candidates = scripmaster_df[scripmaster_df['ScripType'].isin(['CE', 'PE'])]
+        if 'Exch' in candidates.columns:
+            candidates = candidates[candidates['Exch'] == config['exchange']]
 
-        best_ce = None
-        best_pe = None
-        min_ce_diff = float('inf')
-        min_pe_diff = float('inf')
+        codes = candidates['ScripCode'].tolist()
+        ltps = get_ltps(codes)
         target_ltp = config.get('target_ltp', 200)
 
-        for _, scrip in ce_scrips.iterrows():
-            ltp = get_ltp(scrip['ScripCode'])
-            if ltp is not None and ltp > 0:
-                diff = abs(ltp - target_ltp)
-                if diff < min_ce_diff:
-                    min_ce_diff = diff
-                    best_ce = {
-                        'scrip_code': scrip['ScripCode'],
-                        'ltp': ltp,
-                        'name': scrip['Name'],
-                        'scrip_type': 'CE'
-                    }
-            time.sleep(0.1)
+        best = {'CE': None, 'PE': None}
+        min_diff = {'CE': float('inf'), 'PE': float('inf')}
 
-        for _, scrip in pe_scrips.iterrows():
-            ltp = get_ltp(scrip['ScripCode'])
+        for code, name, scrip_type in zip(codes, candidates['Name'].tolist(), candidates['ScripType'].tolist()):
+            ltp = ltps.get(code)
             if ltp is not None and ltp > 0:
                 diff = abs(ltp - target_ltp)
-                if diff < min_pe_diff:
-                    min_pe_diff = diff
-                    best_pe = {
-                        'scrip_code': scrip['ScripCode'],
+                if diff < min_diff[scrip_type]:
+                    min_diff[scrip_type] = diff
+                    best[scrip_type] = {
+                        'scrip_code': code,
                         'ltp': ltp,
-                        'name': scrip['Name'],
-                        'scrip_type': 'PE'
+                        'name': name,
+                        'scrip_type': scrip_type
                     }
-            time.sleep(0.1)
 
+        best_ce, best_pe = best['CE'], best['PE']
         ce_scrip_name = get_scrip_name(best_ce['scrip_code']) if best_ce else None
         pe_scrip_name = get_scrip_name(best_pe['scrip_code']) if best_pe else None
 
@@ -520,8 +672,11 @@ def check_and_handle_price_difference():
         if config.get('auto_scrip_update', 'enabled') != 'enabled':
             return False
         
-        ce_ltp = get_ltp(config['ce_scrip_code'])
-        pe_ltp = get_ltp(config['pe_scrip_code'])
+        tick = market_poller.latest()
+        if tick is None or tick.codes['CE'] != config['ce_scrip_code'] or tick.codes['PE'] != config['pe_scrip_code']:
+            return False
+        ce_ltp = tick.ltps['CE']
+        pe_ltp = tick.ltps['PE']
         
         if not ce_ltp or not pe_ltp or ce_ltp <= 0 or pe_ltp <= 0:
             return False
@@ -551,6 +706,9 @@ def execute_scrip_update_workflow():
         trading_paused = True
         
         logger.info("Starting scrip update workflow...")
+        # Let orders already in flight on either leg complete before squaring off
+        if not wait_for_legs_idle(timeout=30):
+            logger.warning("Leg workers still busy, continuing with scrip update...")
         
         logger.info("Step 1: Squaring off all positions...")
         square_off_success = trading_engine.square_off_all_positions_for_update()
@@ -590,8 +748,9 @@ def update_scrip_codes_immediately():
     global price_history_ce, price_history_pe, ce_stats, pe_stats, config
     
     try:
-        old_ce_ltp = get_ltp(config.get('ce_scrip_code')) if config.get('ce_scrip_code') else 0
-        old_pe_ltp = get_ltp(config.get('pe_scrip_code')) if config.get('pe_scrip_code') else 0
+        old_ltps = get_ltps([config.get('ce_scrip_code'), config.get('pe_scrip_code')])
+        old_ce_ltp = old_ltps.get(config.get('ce_scrip_code')) or 0
+        old_pe_ltp = old_ltps.get(config.get('pe_scrip_code')) or 0
 
         logger.info(f"Old LTPs - CE: ₹{old_ce_ltp}, PE: ₹{old_pe_ltp}")
 
@@ -610,8 +769,17 @@ def update_scrip_codes_immediately():
         config['pe_scrip_code'] = best_pe_scrip['scrip_code']
         config['ce_scrip_name'] = ce_scrip_name
         config['pe_scrip_name'] = pe_scrip_name
+        state_revisions.bump('config')
         
         adjust_history_with_price_difference(old_ce_ltp, old_pe_ltp, best_ce_scrip, best_pe_scrip)
+        event_bus.publish('scrip_update', {
+            'old_ce': old_ce_code,
+            'old_pe': old_pe_code,
+            'new_ce': config['ce_scrip_code'],
+            'new_pe': config['pe_scrip_code'],
+            'ce_scrip_name': ce_scrip_name,
+            'pe_scrip_name': pe_scrip_name
+        })
 
         logger.info(f"Scrip codes updated - CE: {old_ce_code} → {best_ce_scrip['scrip_code']}, PE: {old_pe_code} → {best_pe_scrip['scrip_code']}")
 
@@ -641,17 +809,12 @@ def adjust_history_with_price_difference(old_ce_ltp, old_pe_ltp, new_ce, new_pe)
             logger.info(f"PE adjustment: {old_pe_ltp} → {new_pe['ltp']} ({pe_adjustment_percent:+.2f}%)")
         
         if len(price_history_ce) > 0 and ce_adjustment_percent != 0:
-            adjusted_ce_history = deque(maxlen=310)
-            for price in price_history_ce:
-                adjusted_price = price * (1 + ce_adjustment_percent / 100)
-                adjusted_ce_history.append(max(0.1, adjusted_price))
-            
-            price_history_ce.clear()
-            price_history_ce.extend(adjusted_ce_history)
+            price_history_ce.rescale(1 + ce_adjustment_percent / 100, floor=0.1)
+            trading_engine.smma_engines['CE'].invalidate()
+            trading_engine.extremes['CE'].reset(price_history_ce)
             
             if len(price_history_ce) > 0:
-                ce_high = max(price_history_ce)
-                ce_low = min(price_history_ce)
+                ce_high, ce_low = trading_engine.extremes['CE'].high_low(len(price_history_ce))
                 ce_stats['range_percent'] = ((ce_high - ce_low) / ce_low * 100) if ce_low > 0 else 0
                 
                 if ce_stats['entry_price'] > 0:
@@ -660,17 +823,12 @@ def adjust_history_with_price_difference(old_ce_ltp, old_pe_ltp, new_ce, new_pe)
             logger.info(f"CE history adjusted: {len(price_history_ce)} prices updated by {ce_adjustment_percent:+.2f}%")
         
         if len(price_history_pe) > 0 and pe_adjustment_percent != 0:
-            adjusted_pe_history = deque(maxlen=310)
-            for price in price_history_pe:
-                adjusted_price = price * (1 + pe_adjustment_percent / 100)
-                adjusted_pe_history.append(max(0.1, adjusted_price))
-            
-            price_history_pe.clear()
-            price_history_pe.extend(adjusted_pe_history)
+            price_history_pe.rescale(1 + pe_adjustment_percent / 100, floor=0.1)
+            trading_engine.smma_engines['PE'].invalidate()
+            trading_engine.extremes['PE'].reset(price_history_pe)
             
             if len(price_history_pe) > 0:
-                pe_high = max(price_history_pe)
-                pe_low = min(price_history_pe)
+                pe_high, pe_low = trading_engine.extremes['PE'].high_low(len(price_history_pe))
                 pe_stats['range_percent'] = ((pe_high - pe_low) / pe_low * 100) if pe_low > 0 else 0
                 
                 if pe_stats['entry_price'] > 0:
@@ -681,12 +839,15 @@ def adjust_history_with_price_difference(old_ce_ltp, old_pe_ltp, new_ce, new_pe)
         ce_stats['current_price'] = new_ce['ltp']
         pe_stats['current_price'] = new_pe['ltp']
         
-        if len(price_history_ce) >= 300:
-            ce_stats['smma300'] = trading_engine.calculate_smma(price_history_ce, 300) or 0
+        # Same 300-second window the trading loop uses at the current tick interval
+        smma_samples = trading_engine.period_samples(300)
+        if len(price_history_ce) >= smma_samples:
+            ce_stats['smma300'] = trading_engine.smma_engines['CE'].value(smma_samples) or 0
             
-        if len(price_history_pe) >= 300:
-            pe_stats['smma300'] = trading_engine.calculate_smma(price_history_pe, 300) or 0
+        if len(price_history_pe) >= smma_samples:
+            pe_stats['smma300'] = trading_engine.smma_engines['PE'].value(smma_samples) or 0
         
+        state_revisions.bump('stats')
         logger.info("History adjustment completed successfully!")
         
     except Exception as e:
@@ -697,37 +858,128 @@ def adjust_history_with_price_difference(old_ce_ltp, old_pe_ltp, new_ce, new_pe)
 # ALERT MANAGER CLASS
 # ============================================================================
 
+# Seconds during which repeats of an alert type (same title and scrip) are
+# folded into the first alert instead of adding new ones; 0 disables
+ALERT_COALESCE_WINDOWS = {
+    'volatility': float(os.environ.get('ALERT_COALESCE_VOLATILITY', 60)),
+    'error': float(os.environ.get('ALERT_COALESCE_ERROR', 60))
+}
+
+
 class AlertManager:
-    def __init__(self):
-        self.alerts = []
+    """The most recent alerts in a bounded ring buffer, oldest first.
+
+    Ids come from a counter that never repeats, so ``mark_read`` and
+    ``since_id`` readers stay correct after old alerts are evicted.
+
+    Alerts keyed by (type, title, scrip) are coalesced: a repeat within the
+    type's window updates the open alert's message and "×N in last Ws"
+    counter (same id) rather than adding a new entry. Every change, new
+    alert or update, stamps the alert with the next ``updated_seq``; readers
+    that poll with ``since=<last_seq>`` also see alerts updated in place.
+    """
+
+    def __init__(self, capacity=100, coalesce_windows=None):
+        self._lock = threading.Lock()
+        self.alerts = deque(maxlen=capacity)
+        self._by_id = {}
+        self._next_id = 1
+        self._seq = 0
+        self.coalesce_windows = dict(ALERT_COALESCE_WINDOWS if coalesce_windows is None else coalesce_windows)
+        self._open = {}
+        self.coalesced = 0
     
-    def add_alert(self, alert_type, title, message, severity='info'):
-        alert = {
-            'id': len(self.alerts) + 1,
-            'type': alert_type,
-            'title': title,
-            'message': message,
-            'severity': severity,
-            'timestamp': datetime.now().isoformat(),
-            'read': False
-        }
-        self.alerts.append(alert)
-        logger.info(f"Alert added: {title} - {message}")
+    @staticmethod
+    def _key(alert):
+        return alert['type'], alert['title'], alert['scrip']
+    
+    def _touch(self, alert):
+        self._seq += 1
+        alert['updated_seq'] = self._seq
+    
+    def add_alert(self, alert_type, title, message, severity='info', scrip=None):
+        now = time.time()
+        window = self.coalesce_windows.get(alert_type, 0)
+        with self._lock:
+            alert = self._open.get((alert_type, title, scrip)) if window > 0 else None
+            if alert is not None and now - alert['first_seen'] < window and alert['id'] in self._by_id:
+                alert['count'] += 1
+                alert['message'] = f"{message} (×{alert['count']} in last {now - alert['first_seen']:.0f}s)"
+                alert['severity'] = severity
+                alert['last_timestamp'] = datetime.now().isoformat()
+                alert['read'] = False
+                self._touch(alert)
+                self.coalesced += 1
+                coalesced = True
+            else:
+                alert = {
+                    'id': self._next_id,
+                    'type': alert_type,
+                    'title': title,
+                    'message': message,
+                    'severity': severity,
+                    'scrip': scrip,
+                    'timestamp': datetime.now().isoformat(),
+                    'read': False,
+                    'count': 1,
+                    'first_seen': now
+                }
+                self._next_id += 1
+                self._touch(alert)
+                if len(self.alerts) == self.alerts.maxlen:
+                    evicted = self.alerts[0]
+                    del self._by_id[evicted['id']]
+                    if self._open.get(self._key(evicted)) is evicted:
+                        del self._open[self._key(evicted)]
+                self.alerts.append(alert)
+                self._by_id[alert['id']] = alert
+                if window > 0:
+                    self._open[self._key(alert)] = alert
+                coalesced = False
+        if coalesced:
+            logger.debug(f"Alert repeated: {title} - {alert['message']}")
+        else:
+            logger.info(f"Alert added: {title} - {message}")
         
-        if len(self.alerts) > 100:
-            self.alerts.pop(0)
+        state_revisions.bump('alerts')
+        event_bus.publish('alert', alert)
     
-    def get_alerts(self, limit=10):
-        return sorted(self.alerts, key=lambda x: x['timestamp'], reverse=True)[:limit]
+    @property
+    def last_id(self):
+        return self._next_id - 1
     
-    def get_all_alerts(self):
-        return sorted(self.alerts, key=lambda x: x['timestamp'], reverse=True)
+    @property
+    def last_seq(self):
+        return self._seq
+    
+    def get_alerts(self, limit=10, since_id=0, since=0):
+        """Newest alerts first.
+
+        ``since_id`` keeps only alerts raised after that id; ``since`` keeps
+        only alerts added or updated after that ``updated_seq``.
+        """
+        result = []
+        with self._lock:
+            for alert in reversed(self.alerts):
+                if alert['id'] <= since_id or (limit is not None and len(result) >= limit):
+                    break
+                if alert['updated_seq'] > since:
+                    result.append(alert)
+        return result
+    
+    def get_all_alerts(self, since_id=0, since=0):
+        return self.get_alerts(limit=None, since_id=since_id, since=since)
     
     def mark_read(self, alert_id):
-        for alert in self.alerts:
-            if alert['id'] == alert_id:
-                alert['read'] = True
-                break
+        """Mark an alert read; False if it is unknown or already evicted."""
+        with self._lock:
+            alert = self._by_id.get(alert_id)
+            if alert is None:
+                return False
+            alert['read'] = True
+            self._touch(alert)
+        state_revisions.bump('alerts')
+        return True
 
 
 alert_manager = AlertManager()
@@ -741,21 +993,33 @@ class TradingEngine:
     def __init__(self):
         self.daily_trades = 0
         self.last_trade_date = None
+        # Incremental SMMA per leg; all appends to the price histories go through these
+        self.smma_engines = {
+            'CE': SMMAEngine(price_history_ce),
+            'PE': SMMAEngine(price_history_pe)
+        }
+        # Rolling high/low per leg, mirroring the same appends
+        self.extremes = {
+            'CE': RollingExtremes(price_history_ce.maxlen),
+            'PE': RollingExtremes(price_history_pe.maxlen)
+        }
+        # Running closed-trade statistics per leg and for both legs together
+        self.trade_stats = {
+            'CE': TradeStats(config['capital']),
+            'PE': TradeStats(config['capital']),
+            'COMBINED': TradeStats(config['capital'])
+        }
         
         
     def calculate_smma(self, data, period):
-        """Efficient single-value RMA (Wilder's Moving Average) calculation."""
-        if len(data) < period:
-            return None
+        """Full single-value RMA (Wilder's Moving Average) recomputation."""
+        return calculate_smma(data, period)
 
-        data_list = list(data)
-        rma = sum(data_list[:period]) / period  # initial SMA
 
-        for price in data_list[period:]:
-            rma = (rma * (period - 1) + price) / period
-
-        smma = rma
-        return smma
+    def record_price(self, scrip_type, price):
+        """Append a price to the leg's history and update its running indicators."""
+        self.smma_engines[scrip_type].append(price)
+        self.extremes[scrip_type].append(price)
 
 
     def calculate_time_period(self, scrip_type='CE', current_ltp=None):
@@ -774,17 +1038,14 @@ class TradingEngine:
             return stats.get('time_period', 300)
 
         # Append latest LTP to history
-        price_history.append(current_ltp)
+        self.record_price(scrip_type, current_ltp)
 
         # --- Configurable main period ---
         max_main_period = config.get('main_time_period', 300)
 
         # --- Calculate high, low, and range % over last N data ---
-        price_list = list(price_history)
-        if len(price_list) > 0:
-            recent_prices = price_list[-max_main_period:]
-            high = max(recent_prices)
-            low = min(recent_prices)
+        if len(price_history) > 0:
+            high, low = self.extremes[scrip_type].high_low(self.period_samples(max_main_period))
             range_percent = ((high - low) / low * 100) if low > 0 else 0
         else:
             range_percent = 0
@@ -803,8 +1064,17 @@ class TradingEngine:
         return int(time_period)
 
 
-    def get_real_market_data(self, scrip_type='CE'):
-        """Get real market data using pre-calculated CE/PE time periods."""
+    def period_samples(self, seconds):
+        """Number of price samples spanning ``seconds`` at the configured tick interval."""
+        samples = max(1, round(seconds / config['tick_interval']))
+        return min(samples, PRICE_HISTORY_CAPACITY)
+
+    def get_real_market_data(self, scrip_type='CE', current_ltp=None):
+        """Get real market data using pre-calculated CE/PE time periods.
+
+        ``current_ltp`` can be passed in when the caller already fetched it
+        (e.g. from a batched ``get_ltps`` call); otherwise it is fetched here.
+        """
         global ce_stats, pe_stats, portfolio_data, price_history_ce, price_history_pe
         global scrip_update_in_progress, current_position_ce, current_position_pe, config
 
@@ -825,7 +1095,8 @@ class TradingEngine:
                 stats = pe_stats
 
             # --- Get LTP (called only once) ---
-            current_ltp = get_ltp(scrip_code)
+            if current_ltp is None:
+                current_ltp = get_ltp(scrip_code)
             if current_ltp is None or current_ltp <= 0:
                 logger.warning(f"Invalid LTP for {scrip_type}: {scrip_code}")
                 return None
@@ -835,14 +1106,13 @@ class TradingEngine:
             time_period = self.calculate_time_period(scrip_type, current_ltp)
 
             # --- Calculate SMMA ---
-            smma_val = self.calculate_smma(price_history, time_period)
+            period_samples = self.period_samples(time_period)
+            smma_val = self.smma_engines[scrip_type].value(period_samples)
             stats['smma300'] = smma_val if smma_val is not None else 0
 
             # --- Calculate High / Low / Range ---
             if len(price_history) > 0:
-                slice_prices = list[Any](price_history)[-time_period:]
-                high_price = max(slice_prices)
-                low_price = min(slice_prices)
+                high_price, low_price = self.extremes[scrip_type].high_low(period_samples)
                 range_val = high_price - low_price
                 range_percent = ((high_price - low_price) / low_price * 100) if low_price > 0 else 0
             else:
@@ -855,19 +1125,21 @@ class TradingEngine:
 
             # --- Unrealized P&L ---
             if current_position and stats.get('entry_price', 0) > 0:
+                quantity = self.position_quantity(scrip_type, current_ltp)
                 if current_position == 'BUY':
-                    unrealized_pnl = (current_ltp - stats['entry_price']) * config['quantity']
+                    unrealized_pnl = (current_ltp - stats['entry_price']) * quantity
                 else:
-                    unrealized_pnl = (stats['entry_price'] - current_ltp) * config['quantity']
+                    unrealized_pnl = (stats['entry_price'] - current_ltp) * quantity
 
-                stats['unrealized_pnl'] = unrealized_pnl
-                portfolio_data['unrealized_pnl'] = (
-                    ce_stats.get('unrealized_pnl', 0) + pe_stats.get('unrealized_pnl', 0)
-                )
+                with portfolio_lock:
+                    stats['unrealized_pnl'] = unrealized_pnl
+                    portfolio_data['unrealized_pnl'] = (
+                        ce_stats.get('unrealized_pnl', 0) + pe_stats.get('unrealized_pnl', 0)
+                    )
 
                 pnl_percent = (
-                    abs(unrealized_pnl / (stats['entry_price'] * config['quantity']) * 100)
-                    if (stats['entry_price'] * config['quantity']) != 0 else 0
+                    abs(unrealized_pnl / (stats['entry_price'] * quantity) * 100)
+                    if (stats['entry_price'] * quantity) != 0 else 0
                 )
 
                 if unrealized_pnl < 0 and pnl_percent >= config['stop_loss_percent']:
@@ -919,10 +1191,11 @@ class TradingEngine:
         global config
         
         today = datetime.now().date()
-        if self.last_trade_date != today:
-            self.daily_trades = 0
-            self.last_trade_date = today
-        return self.daily_trades < config['max_trades_per_day']
+        with portfolio_lock:
+            if self.last_trade_date != today:
+                self.daily_trades = 0
+                self.last_trade_date = today
+            return self.daily_trades < config['max_trades_per_day']
     
     def calculate_qty(self, ltp, scrip_type='CE'):
         """Calculate quantity based on 50% capital allocation per scrip with lot size"""
@@ -1135,6 +1408,11 @@ class TradingEngine:
     #         logger.error(f"Error executing {scrip_type} strategy: {e}", exc_info=True)
 
 
+    def position_quantity(self, scrip_type, ltp=0):
+        """Quantity of the leg's open position (sized when it was opened)."""
+        stats = ce_stats if scrip_type == 'CE' else pe_stats
+        return stats.get('quantity') or self.calculate_qty(ltp, scrip_type)
+
     def execute_trading_strategy(self, market_data, scrip_type='CE'):
         """Main entry point for trading strategy execution."""
         global current_position_ce, current_position_pe, ce_stats, pe_stats
@@ -1208,8 +1486,7 @@ class TradingEngine:
         time_period = market_data.get('time_period', 0)
         low_price = market_data.get('low', 0)
         buy_price = stats.get('entry_price', 0)
-        qty = self.calculate_qty(ltp)
-        config['quantity'] = qty
+        qty = self.calculate_qty(ltp, scrip_type)
         
         logger.debug(f"[{scrip_type}] LTP={ltp:.2f} | SMMA300={smma300:.2f} | Range%={rangeinpercent:.2f} | TimePeriod={time_period} | Qty={qty}")
 
@@ -1217,7 +1494,8 @@ class TradingEngine:
         if rangeinpercent > range_work:
             alert_manager.add_alert(
                 'volatility', 'High Volatility',
-                f'{scrip_type} showing high volatility: {rangeinpercent:.2f}%', 'warning'
+                f'{scrip_type} showing high volatility: {rangeinpercent:.2f}%', 'warning',
+                scrip=config[f'{scrip_type.lower()}_scrip_code']
             )
 
         return {
@@ -1324,7 +1602,7 @@ class TradingEngine:
         # Entry: Price crosses above SMMA
         if current_position is None and ltp > smma300 and stop_flag == "No":
             logger.info(f"[{scrip_type}] 🟢 Mid session entry | LTP={ltp:.2f} crossed above SMMA300={smma300:.2f}")
-            self.open_position('BUY', ltp, scrip_type)
+            self.open_position('BUY', ltp, scrip_type, market_info['qty'])
             stats['entry_price'] = ltp
         
         # Exit: Price drops 2% below SMMA
@@ -1403,8 +1681,13 @@ class TradingEngine:
         success_count = 0
         
         try:
+            ltps = get_ltps([
+                config['ce_scrip_code'] if current_position_ce else None,
+                config['pe_scrip_code'] if current_position_pe else None
+            ])
+
             if current_position_ce:
-                ce_ltp = get_ltp(config['ce_scrip_code'])
+                ce_ltp = ltps.get(config['ce_scrip_code'])
                 if ce_ltp and ce_ltp > 0:
                     close_side = 'SELL' if current_position_ce == 'BUY' else 'BUY'
                     if self.place_closing_order(close_side, ce_ltp, 'CE'):
@@ -1412,7 +1695,7 @@ class TradingEngine:
                         logger.info(f"CE position squared off for scrip update")
             
             if current_position_pe:
-                pe_ltp = get_ltp(config['pe_scrip_code'])
+                pe_ltp = ltps.get(config['pe_scrip_code'])
                 if pe_ltp and pe_ltp > 0:
                     close_side = 'SELL' if current_position_pe == 'BUY' else 'BUY'
                     if self.place_closing_order(close_side, pe_ltp, 'PE'):
@@ -1437,10 +1720,19 @@ class TradingEngine:
         
         success_count = 0
         error_count = 0
+
+        try:
+            ltps = get_ltps([
+                config['ce_scrip_code'] if current_position_ce else None,
+                config['pe_scrip_code'] if current_position_pe else None
+            ])
+        except Exception as e:
+            logger.error(f"Error fetching LTPs for square off: {str(e)}")
+            ltps = {}
         
         if current_position_ce:
             try:
-                current_ltp_ce = get_ltp(config['ce_scrip_code'])
+                current_ltp_ce = ltps.get(config['ce_scrip_code'])
                 if current_ltp_ce is not None and current_ltp_ce > 0:
                     close_side = 'SELL' if current_position_ce == 'BUY' else 'BUY'
                     
@@ -1472,7 +1764,7 @@ class TradingEngine:
 
         if current_position_pe:
             try:
-                current_ltp_pe = get_ltp(config['pe_scrip_code'])
+                current_ltp_pe = ltps.get(config['pe_scrip_code'])
                 if current_ltp_pe is not None and current_ltp_pe > 0:
                     close_side = 'SELL' if current_position_pe == 'BUY' else 'BUY'
                     
@@ -1520,29 +1812,29 @@ class TradingEngine:
 
         return success_count > 0 or (success_count == 0 and error_count == 0)
 
-    def open_position(self, side, price, scrip_type='CE'):
-        """Open a new position using real API."""
+    def open_position(self, side, price, scrip_type='CE', quantity=None):
+        """Open a new position using real API, sized for this leg unless ``quantity`` is given."""
         global current_position_ce, current_position_pe, ce_stats, pe_stats, portfolio_data
         global config, orders_ce, orders_pe
 
         try:
+            quantity = quantity or self.calculate_qty(price, scrip_type)
             scrip_code = config['ce_scrip_code'] if scrip_type == 'CE' else config['pe_scrip_code']
             scrip_name = config['ce_scrip_name'] if scrip_type == 'CE' else config['pe_scrip_name']
             stats = ce_stats if scrip_type == 'CE' else pe_stats
             orders = orders_ce if scrip_type == 'CE' else orders_pe
 
             if side == 'BUY':
-                order_success = Buy_place_order(scrip_code, config['quantity'], config['exchange'])
+                order_success = Buy_place_order(scrip_code, quantity, config['exchange'])
             else:
-                order_success = Sell_place_order(scrip_code, config['quantity'], config['exchange'])
+                order_success = Sell_place_order(scrip_code, quantity, config['exchange'])
 
             if order_success:
                 # 👇 Place CSV logging here
                 write_order_to_csv(
-                    "order_history.csv",
                     scrip_name,
                     side,
-                    config['quantity'],
+                    quantity,
                     price,
                     0  # PNL for opening orders
                 )
@@ -1552,26 +1844,29 @@ class TradingEngine:
                     current_position_pe = side
 
                 stats['entry_price'] = price
-                margin_used = price * config['quantity']
+                stats['quantity'] = quantity
+                margin_used = price * quantity
                 stats['max_margin_used'] = max(stats['max_margin_used'], margin_used)
-                portfolio_data['used_margin'] += margin_used
-                portfolio_data['free_margin'] = portfolio_data['available_balance'] - portfolio_data['used_margin']
-                portfolio_data['margin_utilization'] = (portfolio_data['used_margin'] / portfolio_data['available_balance'] * 100)
+                with portfolio_lock:
+                    portfolio_data['used_margin'] += margin_used
+                    portfolio_data['free_margin'] = portfolio_data['available_balance'] - portfolio_data['used_margin']
+                    portfolio_data['margin_utilization'] = (portfolio_data['used_margin'] / portfolio_data['available_balance'] * 100)
+                    self.daily_trades += 1
 
                 order = {
                     'timestamp': datetime.now().isoformat(),
                     'side': side,
                     'price': price,
-                    'quantity': config['quantity'],
+                    'quantity': quantity,
                     'status': 'EXECUTED',
                     'type': 'MARKET',
                     'scrip_type': scrip_type,
                     'scrip_name': scrip_name
                 }
-                orders.append(order)
+                record_order(orders, order)
+                state_revisions.bump('stats')
                 alert_manager.add_alert('trade', 'Position Opened',
-                                    f'{side} {scrip_type} at ₹{price:.2f} - Quantity: {config["quantity"]}', 'success')
-                self.daily_trades += 1
+                                    f'{side} {scrip_type} at ₹{price:.2f} - Quantity: {quantity}', 'success')
                 logger.info(f"Position opened: {side} {scrip_type} at ₹{price:.2f}")
             else:
                 alert_manager.add_alert('error', 'Order Failed',
@@ -1594,6 +1889,7 @@ class TradingEngine:
             stats = ce_stats if scrip_type == 'CE' else pe_stats
             orders = orders_ce if scrip_type == 'CE' else orders_pe
             trades = trades_ce if scrip_type == 'CE' else trades_pe
+            quantity = self.position_quantity(scrip_type, price)
             
             if not current_position:
                 logger.error(f"No {scrip_type} position to close")
@@ -1603,16 +1899,16 @@ class TradingEngine:
                 logger.error(f"Invalid entry price for {scrip_type}: {stats['entry_price']}")
                 return False
             
-            if config['quantity'] <= 0:
-                logger.error(f"Invalid quantity: {config['quantity']}")
+            if quantity <= 0:
+                logger.error(f"Invalid quantity: {quantity}")
                 return False
             
-            logger.info(f"Placing {side} order for {scrip_type} - Scrip: {scrip_code}, Quantity: {config['quantity']}, Price: ₹{price}")
+            logger.info(f"Placing {side} order for {scrip_type} - Scrip: {scrip_code}, Quantity: {quantity}, Price: ₹{price}")
             
             if side == 'BUY':
-                order_success = Buy_place_order(scrip_code, config['quantity'], config['exchange'])
+                order_success = Buy_place_order(scrip_code, quantity, config['exchange'])
             else:
-                order_success = Sell_place_order(scrip_code, config['quantity'], config['exchange'])
+                order_success = Sell_place_order(scrip_code, quantity, config['exchange'])
             
             if not order_success:
                 logger.error(f"Failed to place {side} order for {scrip_type}")
@@ -1620,26 +1916,26 @@ class TradingEngine:
             
             entry_price = stats['entry_price']
             if current_position == 'BUY':
-                pnl = (price - entry_price) * config['quantity']
+                pnl = (price - entry_price) * quantity
             else:
-                pnl = (entry_price - price) * config['quantity']
+                pnl = (entry_price - price) * quantity
             
             logger.info(f"Calculated P&L for {scrip_type}: ₹{pnl:.2f} (Entry: ₹{entry_price}, Exit: ₹{price}, Position: {current_position})")
             
-            self.update_trade_statistics(stats, pnl, trades)
-            self.update_portfolio_on_close(entry_price, pnl)
+            self.update_trade_statistics(scrip_type, pnl)
+            self.update_portfolio_on_close(entry_price, pnl, quantity)
             
             closing_order = {
                 'timestamp': datetime.now().isoformat(),
                 'side': side,
                 'price': price,
-                'quantity': config['quantity'],
+                'quantity': quantity,
                 'status': 'EXECUTED',
                 'type': 'MARKET',
                 'scrip_type': scrip_type,
                 'scrip_name': scrip_name
             }
-            orders.append(closing_order)
+            record_order(orders, closing_order)
             
             trade = {
                 'entry_time': datetime.now().isoformat(),
@@ -1647,21 +1943,24 @@ class TradingEngine:
                 'side': current_position,
                 'entry_price': entry_price,
                 'exit_price': price,
-                'quantity': config['quantity'],
+                'quantity': quantity,
                 'pnl': round(pnl, 2),
                 'scrip_type': scrip_type,
                 'scrip_name': scrip_name
             }
-            trades.append(trade)
+            record_trade(trades, trade)
             
             if scrip_type == 'CE':
                 current_position_ce = None
                 ce_stats['entry_price'] = 0
                 ce_stats['unrealized_pnl'] = 0
+                ce_stats['quantity'] = 0
             else:
                 current_position_pe = None
                 pe_stats['entry_price'] = 0
                 pe_stats['unrealized_pnl'] = 0
+                pe_stats['quantity'] = 0
+            state_revisions.bump('stats')
             
             logger.info(f"Successfully closed {current_position} {scrip_type} position. P&L: ₹{pnl:.2f}")
             return True
@@ -1670,49 +1969,77 @@ class TradingEngine:
             logger.error(f"Error in place_closing_order for {scrip_type}: {str(e)}")
             return False
     
-    def update_trade_statistics(self, stats, pnl, trades):
+    def restore_session_stats(self, records=None):
+        """Rebuild today's closed-trade statistics from order journal records.
+
+        ``records`` defaults to today's journal rows. Closing orders are the
+        SELL rows (positions are opened with BUY, journaled with PNL 0) or
+        any row with a non-zero PNL, so a break-even close is counted as it
+        is live; the leg is taken from the CE/PE token in the scrip name.
+        The daily trade count (every journaled open and close counts, as it
+        does live) and the P&L chart series are rebuilt from the same rows.
+        """
+        if records is None:
+            today = date.today().isoformat()
+            records, _ = trade_history_index.query(from_date=today, to_date=today)
+        closes = pd.DataFrame(list(records), columns=['Date', 'Time', 'Scrip Name', 'Scrip Type', 'PNL'])
+        closes['PNL'] = pd.to_numeric(closes['PNL'], errors='coerce')
+        closes['leg'] = closes['Scrip Name'].str.upper().str.extract(r'\b(CE|PE)\b', expand=False)
+        daily_trades = int(closes['leg'].notna().sum())
+        is_close = (closes['Scrip Type'].str.upper() == 'SELL') | (closes['PNL'] != 0)
+        closes = closes[closes['PNL'].notna() & is_close & closes['leg'].notna()]
+        # Journal times are local wall-clock; convert to epoch seconds like time.time()
+        utc_offset = datetime.now().astimezone().utcoffset().total_seconds()
+        closed_at = pd.to_datetime(closes['Date'] + ' ' + closes['Time'], format='%Y-%m-%d %H:%M:%S')
+        closes['timestamp'] = (closed_at - pd.Timestamp(0)).dt.total_seconds() - utc_offset
+
+        with portfolio_lock:
+            self.trade_stats['COMBINED'] = TradeStats.from_history(
+                closes['PNL'], closes['timestamp'], config['capital'])
+            for leg, stats in (('CE', ce_stats), ('PE', pe_stats)):
+                leg_closes = closes[closes['leg'] == leg]
+                leg_stats = TradeStats.from_history(
+                    leg_closes['PNL'], leg_closes['timestamp'], config['capital'])
+                self.trade_stats[leg] = leg_stats
+                stats.update(leg_stats.stats_fields())
+                stats['net_profit'] = leg_stats.net_pnl
+                stats['realized_profit'] = leg_stats.net_pnl
+            self.daily_trades = daily_trades
+            self.last_trade_date = datetime.now().date()
+            pnl_series.reset(zip(
+                closed_at.dt.strftime('%Y-%m-%dT%H:%M:%S').tolist(),
+                closes['PNL'].round(2).tolist(),
+                closes['leg'].tolist()
+            ))
+        state_revisions.bump('stats', 'trades')
+        logger.info(f"Restored {len(closes)} closed trades ({daily_trades} orders today) from the order journal")
+
+    def update_trade_statistics(self, scrip_type, pnl):
         """Update trading statistics after a trade is closed."""
-        stats['total_trades'] += 1
-        
-        if pnl > 0:
-            stats['win_trades'] += 1
-            stats['max_profit'] = max(stats['max_profit'], pnl)
-            stats['largest_winning_trade'] = max(stats['largest_winning_trade'], pnl)
-            stats['consecutive_wins'] += 1
-            stats['consecutive_losses'] = 0
-        else:
-            stats['lose_trades'] += 1
-            stats['max_loss'] = min(stats['max_loss'], pnl)
-            stats['largest_losing_trade'] = min(stats['largest_losing_trade'], pnl)
-            stats['consecutive_losses'] += 1
-            stats['consecutive_wins'] = 0
-        
-        stats['net_profit'] += pnl
-        stats['realized_profit'] += pnl
-        
-        if stats['win_trades'] > 0:
-            total_wins_profit = sum([t['pnl'] for t in trades if t['pnl'] > 0]) + (pnl if pnl > 0 else 0)
-            stats['avg_profit_per_trade'] = total_wins_profit / stats['win_trades']
-        
-        if stats['lose_trades'] > 0:
-            total_loss = sum([abs(t['pnl']) for t in trades if t['pnl'] < 0]) + (abs(pnl) if pnl < 0 else 0)
-            stats['avg_loss_per_trade'] = -total_loss / stats['lose_trades']
-        
-        total_profit = sum([t['pnl'] for t in trades if t['pnl'] > 0]) + (pnl if pnl > 0 else 0)
-        total_loss = abs(sum([t['pnl'] for t in trades if t['pnl'] < 0])) + (abs(pnl) if pnl < 0 else 0)
-        stats['profit_factor'] = total_profit / total_loss if total_loss > 0 else 0
+        stats = ce_stats if scrip_type == 'CE' else pe_stats
+        leg_stats = self.trade_stats[scrip_type]
+        with portfolio_lock:
+            leg_stats.record(pnl)
+            self.trade_stats['COMBINED'].record(pnl)
+            pnl_series.append(datetime.now().isoformat(), round(pnl, 2), scrip_type)
+
+            stats.update(leg_stats.stats_fields())
+            stats['net_profit'] += pnl
+            stats['realized_profit'] += pnl
+        state_revisions.bump('stats')
     
-    def update_portfolio_on_close(self, entry_price, pnl):
-        """Update portfolio data when a position is closed."""
+    def update_portfolio_on_close(self, entry_price, pnl, quantity):
+        """Update portfolio data when a position of ``quantity`` is closed."""
         global portfolio_data, config
         
-        margin_released = entry_price * config['quantity']
-        portfolio_data['used_margin'] -= margin_released
-        portfolio_data['free_margin'] = portfolio_data['available_balance'] - portfolio_data['used_margin']
-        portfolio_data['realized_pnl'] += pnl
-        portfolio_data['total_pnl'] = portfolio_data['realized_pnl'] + portfolio_data['unrealized_pnl']
-        portfolio_data['roi'] = (portfolio_data['total_pnl'] / config['capital'] * 100) if config['capital'] > 0 else 0
-        portfolio_data['margin_utilization'] = (portfolio_data['used_margin'] / portfolio_data['available_balance'] * 100) if portfolio_data['available_balance'] > 0 else 0
+        margin_released = entry_price * quantity
+        with portfolio_lock:
+            portfolio_data['used_margin'] -= margin_released
+            portfolio_data['free_margin'] = portfolio_data['available_balance'] - portfolio_data['used_margin']
+            portfolio_data['realized_pnl'] += pnl
+            portfolio_data['total_pnl'] = portfolio_data['realized_pnl'] + portfolio_data['unrealized_pnl']
+            portfolio_data['roi'] = (portfolio_data['total_pnl'] / config['capital'] * 100) if config['capital'] > 0 else 0
+            portfolio_data['margin_utilization'] = (portfolio_data['used_margin'] / portfolio_data['available_balance'] * 100) if portfolio_data['available_balance'] > 0 else 0
 
     def close_position(self, side, price, scrip_type='CE'):
         """Close existing position using real API."""
@@ -1726,67 +2053,34 @@ class TradingEngine:
             stats = ce_stats if scrip_type == 'CE' else pe_stats
             orders = orders_ce if scrip_type == 'CE' else orders_pe
             trades = trades_ce if scrip_type == 'CE' else trades_pe
+            quantity = self.position_quantity(scrip_type, price)
             
             if current_position:
                 if side == 'BUY':
-                    order_success = Buy_place_order(scrip_code, config['quantity'], config['exchange'])
+                    order_success = Buy_place_order(scrip_code, quantity, config['exchange'])
                 else:
-                    order_success = Sell_place_order(scrip_code, config['quantity'], config['exchange'])
+                    order_success = Sell_place_order(scrip_code, quantity, config['exchange'])
                 
                 if order_success:
-                    # 👇 Place CSV logging here
-                    write_order_to_csv(
-                    "order_history.csv",
-                    scrip_name,
-                    side,
-                    config['quantity'],
-                    price,
-                    pnl  # PNL for closing orders
-                )
                     entry_price = stats['entry_price']
                     
                     if current_position == 'BUY':
-                        pnl = (price - entry_price) * config['quantity']
-                    else:
-                        pnl = (entry_price - price) * config['quantity']
-                    
-                    stats['total_trades'] += 1
-                    if pnl > 0:
-                        stats['win_trades'] += 1
-                        stats['max_profit'] = max(stats['max_profit'], pnl)
-                        stats['largest_winning_trade'] = max(stats['largest_winning_trade'], pnl)
-                        stats['consecutive_wins'] += 1
-                        stats['consecutive_losses'] = 0
+                        pnl = (price - entry_price) * quantity
                     else:
-                        stats['lose_trades'] += 1
-                        stats['max_loss'] = min(stats['max_loss'], pnl)
-                        stats['largest_losing_trade'] = min(stats['largest_losing_trade'], pnl)
-                        stats['consecutive_losses'] += 1
-                        stats['consecutive_wins'] = 0
+                        pnl = (entry_price - price) * quantity
+
+                    # 👇 Place CSV logging here
+                    write_order_to_csv(
+                        scrip_name,
+                        side,
+                        quantity,
+                        price,
+                        pnl  # PNL for closing orders
+                    )
                     
-                    stats['net_profit'] += pnl
-                    stats['realized_profit'] += pnl
+                    self.update_trade_statistics(scrip_type, pnl)
                     stats['unrealized_pnl'] = 0
-                    
-                    if stats['win_trades'] > 0:
-                        total_wins_profit = sum([t['pnl'] for t in trades if t['pnl'] > 0]) + (pnl if pnl > 0 else 0)
-                        stats['avg_profit_per_trade'] = total_wins_profit / stats['win_trades']
-                    
-                    if stats['lose_trades'] > 0:
-                        total_loss = sum([abs(t['pnl']) for t in trades if t['pnl'] < 0]) + (abs(pnl) if pnl < 0 else 0)
-                        stats['avg_loss_per_trade'] = -total_loss / stats['lose_trades']
-                    
-                    total_profit = sum([t['pnl'] for t in trades if t['pnl'] > 0]) + (pnl if pnl > 0 else 0)
-                    total_loss = abs(sum([t['pnl'] for t in trades if t['pnl'] < 0])) + (abs(pnl) if pnl < 0 else 0)
-                    stats['profit_factor'] = total_profit / total_loss if total_loss > 0 else 0
-                    
-                    margin_released = entry_price * config['quantity']
-                    portfolio_data['used_margin'] -= margin_released
-                    portfolio_data['free_margin'] = portfolio_data['available_balance'] - portfolio_data['used_margin']
-                    portfolio_data['realized_pnl'] += pnl
-                    portfolio_data['total_pnl'] = portfolio_data['realized_pnl'] + portfolio_data['unrealized_pnl']
-                    portfolio_data['roi'] = (portfolio_data['total_pnl'] / config['capital'] * 100)
-                    portfolio_data['margin_utilization'] = (portfolio_data['used_margin'] / portfolio_data['available_balance'] * 100)
+                    self.update_portfolio_on_close(entry_price, pnl, quantity)
                     
                     trade = {
                         'entry_time': orders[-1]['timestamp'] if orders else datetime.now().isoformat(),
@@ -1794,24 +2088,24 @@ class TradingEngine:
                         'side': current_position,
                         'entry_price': entry_price,
                         'exit_price': price,
-                        'quantity': config['quantity'],
+                        'quantity': quantity,
                         'pnl': round(pnl, 2),
                         'scrip_type': scrip_type,
                         'scrip_name': scrip_name
                     }
-                    trades.append(trade)
+                    record_trade(trades, trade)
                     
                     order = {
                         'timestamp': datetime.now().isoformat(),
                         'side': side,
                         'price': price,
-                        'quantity': config['quantity'],
+                        'quantity': quantity,
                         'status': 'EXECUTED',
                         'type': 'MARKET',
                         'scrip_type': scrip_type,
                         'scrip_name': scrip_name
                     }
-                    orders.append(order)
+                    record_order(orders, order)
                     
                     severity = 'success' if pnl > 0 else 'error'
                     alert_manager.add_alert('trade', 'Position Closed', 
@@ -1820,11 +2114,15 @@ class TradingEngine:
                     if scrip_type == 'CE':
                         current_position_ce = None
                         ce_stats['entry_price'] = 0
+                        ce_stats['quantity'] = 0
                     else:
                         current_position_pe = None
                         pe_stats['entry_price'] = 0
+                        pe_stats['quantity'] = 0
+                    state_revisions.bump('stats')
                     
-                    self.daily_trades += 1
+                    with portfolio_lock:
+                        self.daily_trades += 1
                     logger.info(f"Position closed: {current_position} {scrip_type} P&L: ₹{pnl:.2f}")
                 else:
                     alert_manager.add_alert('error', 'Order Failed', 
@@ -1835,36 +2133,315 @@ class TradingEngine:
             alert_manager.add_alert('error', 'Position Error', f'Failed to close position: {str(e)}', 'error')
 
 
+# Cumulative P&L chart points, extended as trades close
+pnl_series = PnlSeries()
+
 # Create trading engine instance
 trading_engine = TradingEngine()
+try:
+    trading_engine.restore_session_stats()
+except Exception as e:
+    logger.error(f"Error restoring trade statistics from the order journal: {str(e)}")
+
+
+# ============================================================================
+# MARKET DATA POLLER
+# ============================================================================
+
+# Immutable snapshot of one poll: LTPs and scrip codes keyed by 'CE'/'PE'
+Tick = namedtuple('Tick', ['seq', 'timestamp', 'ltps', 'codes'])
+
+
+class MarketDataPoller:
+    """Single background thread that owns LTP acquisition for the CE/PE scrips.
+
+    Every poll publishes an immutable Tick. The trading loop consumes ticks in
+    order and publishes the derived market data back here; HTTP routes only
+    ever read from this cache, so open dashboards never trigger API calls or
+    add samples to the price history.
+    """
+
+    def __init__(self, interval=1.0, idle_timeout=30):
+        self.scheduler = TickScheduler(interval)
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._latest = None
+        self._market_data = {}
+        self._thread = None
+        self._last_read = 0
+
+    @property
+    def interval(self):
+        return self.scheduler.interval
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='market-data-poller', daemon=True)
+                self._thread.start()
+
+    def touch(self):
+        """Mark the cache as in use by a reader, starting the poller if needed."""
+        self._last_read = time.time()
+        self.start()
+
+    def latest(self):
+        return self._latest
+
+    def wait_for_tick(self, after_seq, timeout=None):
+        """Block until a tick newer than ``after_seq`` is published; None on timeout."""
+        with self._cond:
+            self._cond.wait_for(lambda: self._latest is not None and self._latest.seq > after_seq, timeout)
+            tick = self._latest
+        return tick if tick is not None and tick.seq > after_seq else None
+
+    def publish_market_data(self, scrip_type, market_data):
+        self._market_data[scrip_type] = MappingProxyType(dict(market_data))
+
+    def get_market_data(self, scrip_type):
+        return self._market_data.get(scrip_type)
+
+    def poll_once(self):
+        codes = {'CE': config['ce_scrip_code'], 'PE': config['pe_scrip_code']}
+        ltps = get_ltps(codes.values())
+        previous = self._latest
+        tick = Tick(
+            seq=previous.seq + 1 if previous else 1,
+            timestamp=time.time(),
+            ltps=MappingProxyType({leg: ltps.get(code) for leg, code in codes.items()}),
+            codes=MappingProxyType(codes)
+        )
+        with self._cond:
+            self._latest = tick
+            self._cond.notify_all()
+        state_revisions.bump('market')
+        # While trading, the loop publishes once both legs have processed the tick;
+        # otherwise no leg is running and this is the only publisher
+        if not trading_active:
+            publish_snapshot()
+        return tick
+
+    def _run(self):
+        while True:
+            try:
+                # Fixed-rate ticks: a slow poll shortens the next wait instead of delaying every later tick
+                self.scheduler.wait()
+                idle = not trading_active and time.time() - self._last_read > self.idle_timeout
+                if not idle:
+                    self.poll_once()
+            except Exception as e:
+                logger.error(f"Error polling market data: {str(e)}")
+                time.sleep(1)
+
+
+market_poller = MarketDataPoller(interval=config['tick_interval'])
 
 
 # ============================================================================
 # TRADING LOOP
 # ============================================================================
 
+# Sections of the dashboard snapshot; the tick event carries the per-tick subset
+SNAPSHOT_FIELDS = ('trading_active', 'market', 'stats', 'portfolio', 'positions',
+                   'alerts', 'orders', 'trades', 'analytics', 'config')
+TICK_FIELDS = ('trading_active', 'market', 'stats', 'portfolio', 'positions')
+
+dashboard_snapshot = SnapshotStore()
+
+# Closed trades carried by the snapshot; older ones are read from /api/trades
+SNAPSHOT_TRADES = int(os.environ.get('SNAPSHOT_TRADES', 50))
+
+
+def recent_trades(limit):
+    """The ``limit`` most recent closed trades of both legs, newest first."""
+    # Each leg's list is appended in exit order, so only its tail can be among the most recent
+    combined = trades_ce[-limit:] + trades_pe[-limit:]
+    combined.sort(key=lambda x: x['exit_time'], reverse=True)
+    return combined[:limit]
+
+
+def build_snapshot():
+    """Everything the dashboard shows, assembled from one consistent pass over the state."""
+    market = {}
+    for leg in ('CE', 'PE'):
+        try:
+            market[leg] = build_market_data(leg)
+        except LookupError:
+            market[leg] = None
+    combined_orders = orders_ce[-10:] + orders_pe[-10:]
+    combined_orders.sort(key=lambda x: x['timestamp'], reverse=True)
+    return {
+        'trading_active': trading_active,
+        'market': market,
+        'stats': {
+            'CE': build_trading_stats('CE'),
+            'PE': build_trading_stats('PE'),
+            'combined': build_combined_stats()
+        },
+        'portfolio': build_portfolio(),
+        'positions': build_positions(),
+        'alerts': alert_manager.get_all_alerts(),
+        'orders': combined_orders[:10],
+        'trades': recent_trades(SNAPSHOT_TRADES),
+        'analytics': {
+            'trade_distribution': build_trade_distribution(),
+            'performance_metrics': build_performance_metrics()
+        },
+        'config': dict(config)
+    }
+
+
+def publish_snapshot():
+    """Precompute the snapshot for this tick and push its tick subset to stream subscribers."""
+    try:
+        revisions = state_revisions.snapshot()
+        snapshot = build_snapshot()
+        dashboard_snapshot.publish(snapshot, revisions)
+        if event_bus.has_subscribers:
+            event_bus.publish('tick', {name: snapshot[name] for name in TICK_FIELDS})
+    except Exception as e:
+        logger.error(f"Error publishing snapshot: {str(e)}")
+
+
+_first_snapshot_lock = threading.Lock()
+
+
+def current_snapshot():
+    """The last published snapshot; built here only if none has been published yet.
+
+    Snapshots are published by whichever loop drives ticks (the trading loop
+    once both legs are done, the poller while trading is stopped), so request
+    threads never build one from a half-processed tick.
+    """
+    _, snapshot, _ = dashboard_snapshot.get()
+    if snapshot is None:
+        with _first_snapshot_lock:
+            _, snapshot, _ = dashboard_snapshot.get()
+            if snapshot is None:
+                publish_snapshot()
+                _, snapshot, _ = dashboard_snapshot.get()
+    return snapshot
+
+
+class LegWorker:
+    """Dedicated thread that runs one leg's market data and strategy per tick.
+
+    The trading loop hands each tick to both legs, so a slow order round-trip
+    on CE never delays PE's price read or decision (and vice versa). A worker
+    still busy when newer ticks arrive skips straight to the latest one.
+    """
+
+    def __init__(self, scrip_type):
+        self.scrip_type = scrip_type
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._done_seq = 0
+        self._thread = None
+        self.skipped_ticks = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f'leg-{self.scrip_type.lower()}', daemon=True)
+                self._thread.start()
+
+    def submit(self, tick):
+        with self._cond:
+            if self._pending is not None:
+                self.skipped_ticks += 1
+            self._pending = tick
+            self._cond.notify_all()
+
+    def wait_done(self, seq, timeout=None):
+        """Block until tick ``seq`` (or a later one) has been processed; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._done_seq >= seq, timeout)
+
+    def wait_idle(self, timeout=None):
+        """Block until no tick is queued or being processed; False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._busy, timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None)
+                tick, self._pending = self._pending, None
+                self._busy = True
+            try:
+                self.process(tick)
+            except Exception as e:
+                logger.error(f"Error in {self.scrip_type} leg worker: {str(e)}")
+                alert_manager.add_alert('error', 'Trading Loop Error', str(e), 'error', scrip=self.scrip_type)
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._done_seq = max(self._done_seq, tick.seq)
+                    self._cond.notify_all()
+
+    def process(self, tick):
+        scrip_type = self.scrip_type
+        if trading_paused or scrip_update_in_progress:
+            return
+        # Skip ticks polled for scrips that have since been rotated out
+        if tick.codes[scrip_type] != config[f'{scrip_type.lower()}_scrip_code']:
+            return
+        trading_engine.calculate_time_period(scrip_type)
+        market_data = trading_engine.get_real_market_data(scrip_type, tick.ltps[scrip_type] or 0)
+        if market_data:
+            market_poller.publish_market_data(scrip_type, market_data)
+            trading_engine.execute_trading_strategy(market_data, scrip_type)
+
+
+leg_workers = {'CE': LegWorker('CE'), 'PE': LegWorker('PE')}
+
+
+def wait_for_legs_idle(timeout=None):
+    """Wait for both legs to finish in-flight work (e.g. before rotating scrips)."""
+    deadline = None if timeout is None else time.time() + timeout
+    for worker in leg_workers.values():
+        remaining = None if deadline is None else max(0, deadline - time.time())
+        if not worker.wait_idle(remaining):
+            return False
+    return True
+
+
 def trading_loop():
-    """Main trading loop with CE/PE adaptive period."""
+    """Main trading loop with CE/PE adaptive period, driven by poller ticks.
+
+    Each tick is processed by the per-leg workers concurrently; the loop
+    publishes one snapshot per tick once both legs are done with it, so the
+    snapshot never mixes one tick's prices with the previous tick's positions.
+    """
     global trading_active
 
     alert_manager.add_alert('system', 'Trading Started', 'Real data trading engine started', 'success')
+    market_poller.start()
+    for worker in leg_workers.values():
+        worker.start()
+    last_seq = 0
 
     while trading_active:
         try:
             check_and_handle_price_difference()
-            if not trading_paused and not scrip_update_in_progress:
-                trading_engine.calculate_time_period('CE')
-                trading_engine.calculate_time_period('PE')
 
-                ce_data = trading_engine.get_real_market_data('CE')
-                if ce_data:
-                    trading_engine.execute_trading_strategy(ce_data, 'CE')
+            tick = market_poller.wait_for_tick(last_seq, timeout=5)
+            if tick is None:
+                continue
+            last_seq = tick.seq
 
-                pe_data = trading_engine.get_real_market_data('PE')
-                if pe_data:
-                    trading_engine.execute_trading_strategy(pe_data, 'PE')
-
-            time.sleep(1)
+            if not trading_paused and not scrip_update_in_progress:
+                for worker in leg_workers.values():
+                    worker.submit(tick)
+                for worker in leg_workers.values():
+                    worker.wait_done(tick.seq)
+                state_revisions.bump('stats')
+            else:
+                # A tick handed over before the pause may still be in flight
+                wait_for_legs_idle()
+            # Published even when paused or mid scrip update, so prices stay live
+            publish_snapshot()
 
         except Exception as e:
             logger.error(f"Error in trading loop: {str(e)}")
@@ -1893,6 +2470,30 @@ def excel_time_to_time(excel_time):
 # FLASK ROUTES
 # ============================================================================
 
+def conditional_json(collections, build):
+    """JSON response for ``build()`` tagged with the revisions of ``collections``.
+
+    Answers 304 without calling ``build`` when the client's If-None-Match
+    already holds the current tag.
+    """
+    etag = state_revisions.etag(*collections)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Cached copies must be revalidated on every poll
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def items_since(items, since):
+    """Items of a seq-ordered list appended after revision ``since``."""
+    if not since:
+        return list(items)
+    return items[bisect_right(items, since, key=lambda item: item.get('seq', 0)):]
+
+
 @app.route('/')
 def index():
     return render_template('login.html')
@@ -1943,30 +2544,14 @@ def api_scrips_expiries():
     Returns unique expiry dates for a given exchange.
     Query: ?exch=N|B|M
     """
-    global scripmaster_df
+    global scrip_index
     exch = request.args.get('exch')
 
     try:
-        if scripmaster_df is None or scripmaster_df.empty:
+        if scrip_index is None:
             return jsonify({'expiries': []})
 
-        df = scripmaster_df
-        if exch in VALID_EXCHANGES:
-            df = df[df['Exch'] == exch]
-
-        # Only options rows (CE/PE). ExchType 'D' is derivatives; keep broad filter for safety.
-        df = df[df['ScripType'].isin(['CE', 'PE'])]
-
-        # Normalize to string YYYY-MM-DD
-        expiries = (
-            df['Expiry']
-            .dropna()
-            .astype(str)
-            .str.slice(0, 10)  # in case timestamps are present
-            .unique()
-            .tolist()
-        )
-        expiries.sort()
+        expiries = scrip_index.expiry_list(exch if exch in VALID_EXCHANGES else None)
         return jsonify({'expiries': expiries})
     except Exception as e:
         logger.error(f"/api/scrips/expiries error: {e}")
@@ -1978,39 +2563,19 @@ def api_scrips_list():
     Returns CE and PE scrip lists for selected exchange and expiry.
     Query: ?exch=N|B|M&expiry=YYYY-MM-DD
     """
-    global scripmaster_df
+    global scrip_index
     exch = request.args.get('exch')
     expiry = request.args.get('expiry')
 
     try:
-        if scripmaster_df is None or scripmaster_df.empty:
+        if scrip_index is None:
             return jsonify({'ce': [], 'pe': []})
 
-        df = scripmaster_df
-        if exch in VALID_EXCHANGES:
-            df = df[df['Exch'] == exch]
-
-        if expiry:
-            # Ensure same string format match as in /expiries
-            df = df[df['Expiry'].astype(str).str.slice(0, 10) == expiry]
-
-        df = df[df['ScripType'].isin(['CE', 'PE'])]
+        exch = exch if exch in VALID_EXCHANGES else None
+        expiry = expiry or None
 
-        def to_items(sub):
-            return [{
-                'scrip_code': int(row['ScripCode']),
-                'name': str(row.get('Name', 'Unknown')),
-                'strike': float(row.get('StrikeRate')) if not pd.isna(row.get('StrikeRate')) else None,
-                'lot_size': int(row.get('LotSize')) if not pd.isna(row.get('LotSize')) else None,
-                'scrip_type': row.get('ScripType')
-            } for _, row in sub.iterrows()]
-
-        ce_items = to_items(df[df['ScripType'] == 'CE'])
-        pe_items = to_items(df[df['ScripType'] == 'PE'])
-
-        # Sort by strike if available
-        ce_items.sort(key=lambda x: (x['strike'] is None, x['strike']))
-        pe_items.sort(key=lambda x: (x['strike'] is None, x['strike']))
+        ce_items = scrip_index.option_list('CE', exch, expiry)
+        pe_items = scrip_index.option_list('PE', exch, expiry)
 
         return jsonify({'ce': ce_items, 'pe': pe_items})
     except Exception as e:
@@ -2023,149 +2588,193 @@ def get_portfolio():
     global portfolio_data, ce_stats, pe_stats, current_position_ce, current_position_pe, config
     
     try:
+        return conditional_json(('stats', 'orders', 'trades', 'config'), build_portfolio)
+        
+    except Exception as e:
+        logger.error(f"Error getting portfolio: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+
+def build_portfolio():
+    """Refresh portfolio_data from the leg stats and return a copy of it."""
+    global portfolio_data, ce_stats, pe_stats, current_position_ce, current_position_pe, config
+    
+    with portfolio_lock:
         portfolio_data['unrealized_pnl'] = ce_stats['unrealized_pnl'] + pe_stats['unrealized_pnl']
         portfolio_data['realized_pnl'] = ce_stats['realized_profit'] + pe_stats['realized_profit']
         portfolio_data['total_pnl'] = portfolio_data['realized_pnl'] + portfolio_data['unrealized_pnl']
         portfolio_data['roi'] = (portfolio_data['total_pnl'] / config['capital'] * 100) if config['capital'] > 0 else 0
-        
+    
         positions = []
         if current_position_ce:
             positions.append({
                 'scrip_type': 'CE',
                 'side': current_position_ce,
-                'quantity': config['quantity'],
+                'quantity': ce_stats['quantity'],
                 'entry_price': ce_stats['entry_price'],
                 'current_price': ce_stats['current_price'],
                 'pnl': ce_stats['unrealized_pnl']
             })
-        
+    
         if current_position_pe:
             positions.append({
                 'scrip_type': 'PE',
                 'side': current_position_pe,
-                'quantity': config['quantity'],
+                'quantity': pe_stats['quantity'],
                 'entry_price': pe_stats['entry_price'],
                 'current_price': pe_stats['current_price'],
                 'pnl': pe_stats['unrealized_pnl']
             })
-        
+    
         portfolio_data['positions'] = positions
-        
-        return jsonify(portfolio_data)
-        
-    except Exception as e:
-        logger.error(f"Error getting portfolio: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+        return dict(portfolio_data)
 
 
 @app.route('/api/alerts')
 def get_alerts():
-    return jsonify({'alerts': alert_manager.get_alerts()})
+    # since_id=<id>: only alerts raised after it
+    # since=<seq>: only alerts raised or updated (coalesced, read) after it
+    since_id = request.args.get('since_id', 0, type=int)
+    since = request.args.get('since', 0, type=int)
+    return conditional_json(('alerts',), lambda: {
+        'alerts': alert_manager.get_alerts(since_id=since_id, since=since),
+        'last_id': alert_manager.last_id,
+        'last_seq': alert_manager.last_seq
+    })
 
 
 @app.route('/api/alerts/all')
 def get_all_alerts():
-    return jsonify({'alerts': alert_manager.get_all_alerts()})
+    since_id = request.args.get('since_id', 0, type=int)
+    since = request.args.get('since', 0, type=int)
+    return conditional_json(('alerts',), lambda: {
+        'alerts': alert_manager.get_all_alerts(since_id=since_id, since=since),
+        'last_id': alert_manager.last_id,
+        'last_seq': alert_manager.last_seq
+    })
 
 
 @app.route('/api/alerts/<int:alert_id>/read', methods=['POST'])
 def mark_alert_read(alert_id):
-    alert_manager.mark_read(alert_id)
+    if not alert_manager.mark_read(alert_id):
+        return jsonify({'success': False, 'error': 'Alert not found'}), 404
     return jsonify({'success': True})
 
 
 @app.route('/api/market_data/<scrip_type>')
 def get_market_data(scrip_type):
     try:
-        market_data = trading_engine.get_real_market_data(scrip_type.upper())
-        if market_data:
-            return jsonify(market_data)
-        else:
-            return jsonify({'error': 'Failed to get market data'}), 500
+        scrip_type = scrip_type.upper()
+        market_poller.touch()
+        return conditional_json(('market', 'stats'), lambda: build_market_data(scrip_type))
+    except LookupError:
+        return jsonify({'error': 'Failed to get market data'}), 500
     except Exception as e:
         logger.error(f"Error getting market data for {scrip_type}: {str(e)}")
         return jsonify({'error': f'Error: {str(e)}'}), 500
 
 
+def build_market_data(scrip_type):
+    """Market view for one leg; raises LookupError when no LTP is available yet."""
+    # While trading, the loop publishes the full derived view for each tick
+    market_data = market_poller.get_market_data(scrip_type) if trading_active else None
+    if market_data:
+        return dict(market_data)
+
+    tick = market_poller.latest()
+    ltp = tick.ltps.get(scrip_type) if tick else None
+    if not ltp:
+        raise LookupError(scrip_type)
+
+    stats = ce_stats if scrip_type == 'CE' else pe_stats
+    scrip_code = tick.codes[scrip_type]
+    return {
+        'ltp': ltp,
+        'smma300': stats['smma300'],
+        'time_period': stats['time_period'],
+        'high': stats['high'],
+        'low': stats['low'],
+        'range': stats.get('range', 0),
+        'rangeinpercent': stats['range_percent'],
+        'scrip_type': scrip_type,
+        'scrip_code': scrip_code,
+        'scrip_name': get_scrip_name(scrip_code)
+    }
+
+
 @app.route('/api/trading_stats/<scrip_type>')
 def get_trading_stats(scrip_type):
-    global ce_stats, pe_stats
-    
     if scrip_type.upper() == 'COMBINED':
         return get_combined_trading_stats()
     
-    stats = ce_stats if scrip_type.upper() == 'CE' else pe_stats
-    win_ratio = (stats['win_trades'] / stats['total_trades'] * 100) if stats['total_trades'] > 0 else 0
+    leg = 'CE' if scrip_type.upper() == 'CE' else 'PE'
+    return conditional_json(('stats', 'trades'), lambda: build_trading_stats(leg))
+
+
+def build_trading_stats(leg):
+    """Trading statistics for one leg ('CE' or 'PE')."""
+    stats = ce_stats if leg == 'CE' else pe_stats
+    trade_stats = trading_engine.trade_stats[leg]
     
-    return jsonify({
-        'total_trades': stats['total_trades'],
-        'win_trades': stats['win_trades'],
-        'lose_trades': stats['lose_trades'],
-        'win_ratio': f"{win_ratio:.1f}%",
-        'max_profit': round(stats['max_profit'], 2),
-        'max_loss': round(stats['max_loss'], 2),
+    return {
+        'total_trades': trade_stats.total_trades,
+        'win_trades': trade_stats.win_trades,
+        'lose_trades': trade_stats.lose_trades,
+        'win_ratio': f"{trade_stats.win_rate:.1f}%",
+        'max_profit': round(trade_stats.largest_win, 2),
+        'max_loss': round(trade_stats.largest_loss, 2),
         'net_profit': round(stats['net_profit'], 2),
         'realized_profit': round(stats['realized_profit'], 2),
         'unrealized_pnl': round(stats['unrealized_pnl'], 2),
-        'profit_factor': round(stats['profit_factor'], 2),
-        'avg_profit_per_trade': round(stats['avg_profit_per_trade'], 2),
-        'avg_loss_per_trade': round(stats['avg_loss_per_trade'], 2),
-        'largest_winning_trade': round(stats['largest_winning_trade'], 2),
-        'largest_losing_trade': round(stats['largest_losing_trade'], 2),
-        'consecutive_wins': stats['consecutive_wins'],
-        'consecutive_losses': stats['consecutive_losses'],
+        'profit_factor': round(trade_stats.profit_factor, 2),
+        'avg_profit_per_trade': round(trade_stats.avg_profit_per_trade, 2),
+        'avg_loss_per_trade': round(trade_stats.avg_loss_per_trade, 2),
+        'largest_winning_trade': round(trade_stats.largest_win, 2),
+        'largest_losing_trade': round(trade_stats.largest_loss, 2),
+        'consecutive_wins': trade_stats.consecutive_wins,
+        'consecutive_losses': trade_stats.consecutive_losses,
+        'max_consecutive_wins': trade_stats.max_consecutive_wins,
+        'max_consecutive_losses': trade_stats.max_consecutive_losses,
+        'sharpe_ratio': round(trade_stats.sharpe_ratio, 4),
         'current_price': stats['current_price'],
         'high': stats['high'],
         'low': stats['low'],
         'smma300': round(stats['smma300'], 2),
         'range_percent': round(stats['range_percent'], 2)
-    })
+    }
 
 
 @app.route('/api/trading_stats/combined')
 def get_combined_trading_stats():
+    return conditional_json(('stats', 'trades', 'config'), build_combined_stats)
+
+
+def build_combined_stats():
+    """Trading statistics across both legs."""
     global ce_stats, pe_stats, config
     
-    combined_stats = {
-        'total_trades': ce_stats['total_trades'] + pe_stats['total_trades'],
-        'win_trades': ce_stats['win_trades'] + pe_stats['win_trades'],
-        'lose_trades': ce_stats['lose_trades'] + pe_stats['lose_trades'],
-        'max_profit': max(ce_stats['max_profit'], pe_stats['max_profit']),
-        'max_loss': min(ce_stats['max_loss'], pe_stats['max_loss']),
-        'net_profit': ce_stats['net_profit'] + pe_stats['net_profit'],
-        'realized_profit': ce_stats['realized_profit'] + pe_stats['realized_profit'],
-        'unrealized_pnl': ce_stats['unrealized_pnl'] + pe_stats['unrealized_pnl']
-    }
-    
-    win_ratio = (combined_stats['win_trades'] / combined_stats['total_trades'] * 100) if combined_stats['total_trades'] > 0 else 0
-    roi = (combined_stats['net_profit'] / config['capital'] * 100) if config['capital'] > 0 else 0
+    trade_stats = trading_engine.trade_stats['COMBINED']
+    net_profit = ce_stats['net_profit'] + pe_stats['net_profit']
+    roi = (net_profit / config['capital'] * 100) if config['capital'] > 0 else 0
     
-    return jsonify({
-        'total_trades': combined_stats['total_trades'],
-        'win_trades': combined_stats['win_trades'],
-        'lose_trades': combined_stats['lose_trades'],
-        'win_ratio': f"{win_ratio:.1f}%",
-        'max_profit': round(combined_stats['max_profit'], 2),
-        'max_loss': round(combined_stats['max_loss'], 2),
-        'net_profit': round(combined_stats['net_profit'], 2),
-        'realized_profit': round(combined_stats['realized_profit'], 2),
-        'unrealized_pnl': round(combined_stats['unrealized_pnl'], 2),
+    return {
+        'total_trades': trade_stats.total_trades,
+        'win_trades': trade_stats.win_trades,
+        'lose_trades': trade_stats.lose_trades,
+        'win_ratio': f"{trade_stats.win_rate:.1f}%",
+        'max_profit': round(trade_stats.largest_win, 2),
+        'max_loss': round(trade_stats.largest_loss, 2),
+        'net_profit': round(net_profit, 2),
+        'realized_profit': round(ce_stats['realized_profit'] + pe_stats['realized_profit'], 2),
+        'unrealized_pnl': round(ce_stats['unrealized_pnl'] + pe_stats['unrealized_pnl'], 2),
+        'profit_factor': round(trade_stats.profit_factor, 2),
+        'sharpe_ratio': round(trade_stats.sharpe_ratio, 4),
         'roi': f"{roi:.2f}%"
-    })
+    }
 
 @app.route('/api/trade-history')
 def trade_history():
     try:
-        df = pd.read_csv("order_history.csv")
-
-        # Convert string date/time to datetime objects
-        if 'Date' in df.columns:
-            # Handle DD-MM-YYYY format
-            df['Date'] = pd.to_datetime(df['Date'], format='%d-%m-%Y', errors='coerce')
-        if 'Time' in df.columns:
-            # Time is already in HH:MM:SS format, keep as string
-            pass
-
         # Handle query parameters
         from_date = request.args.get('from_date')
         to_date = request.args.get('to_date')
@@ -2173,38 +2782,62 @@ def trade_history():
         scrip_type = request.args.get('scrip_type')
         pnl_min = request.args.get('pnl_min', type=float)
         pnl_max = request.args.get('pnl_max', type=float)
-
-        # Filter date range
+        # Pagination: page size and the journal id to continue from
+        limit = request.args.get('limit', type=int)
+        cursor = request.args.get('cursor', type=int)
+        descending = request.args.get('order', 'asc').lower() == 'desc'
+        # Only rows recorded after this journal id (incremental tail)
+        after_id = request.args.get('after_id', type=int)
+        if after_id is not None and cursor is None and not descending:
+            cursor = after_id
+
+        # Validate date range
         if from_date:
-            from_date = datetime.strptime(from_date, '%Y-%m-%d')
-            df = df[df['Date'] >= from_date]
+            datetime.strptime(from_date, '%Y-%m-%d')
         if to_date:
-            to_date = datetime.strptime(to_date, '%Y-%m-%d')
-            df = df[df['Date'] <= to_date]
-
-        # Filter by scrip name or type
-        if scrip_name:
-            df = df[df['Scrip Name'].str.contains(scrip_name, case=False, na=False)]
-        if scrip_type:
-            df = df[df['Scrip Type'].str.upper() == scrip_type.upper()]
+            datetime.strptime(to_date, '%Y-%m-%d')
+
+        if limit is not None and limit <= 0:
+            raise ValueError('limit must be positive')
+
+        data, next_cursor = trade_history_index.query(
+            from_date=from_date,
+            to_date=to_date,
+            scrip_name=scrip_name,
+            scrip_type=scrip_type,
+            pnl_min=pnl_min,
+            pnl_max=pnl_max,
+            cursor=cursor,
+            limit=limit,
+            descending=descending
+        )
+        last_id = max((row['id'] for row in data), default=after_id or 0)
 
-        # PNL filter
-        if 'PNL' in df.columns:
-            if pnl_min is not None:
-                df = df[df['PNL'] >= pnl_min]
-            if pnl_max is not None:
-                df = df[df['PNL'] <= pnl_max]
+        return jsonify({'data': data, 'count': len(data), 'next_cursor': next_cursor, 'last_id': last_id})
 
-        # Clean up data for JSON
-        df['Date'] = df['Date'].astype(str)
-        df['Time'] = df['Time'].astype(str)
-        data = df.fillna('').to_dict(orient='records')
+    except Exception as e:
+        return jsonify({'error': str(e), 'data': []})
 
-        return jsonify({'data': data, 'count': len(data)})
 
+@app.route('/api/trade-history/daily')
+def trade_history_daily():
+    try:
+        from_date = request.args.get('from_date')
+        to_date = request.args.get('to_date')
+        return jsonify({'days': trade_history_index.daily_summary(from_date, to_date)})
     except Exception as e:
-        return jsonify({'error': str(e), 'data': []})
+        return jsonify({'error': str(e), 'days': []})
+
 
+@app.route('/api/trade-history/export')
+def trade_history_export():
+    buffer = io.StringIO()
+    order_journal.export_csv(buffer)
+    return Response(
+        buffer.getvalue(),
+        mimetype='text/csv',
+        headers={'Content-Disposition': 'attachment; filename=order_history.csv'}
+    )
 
 
 @app.route('/api/orders/<scrip_type>')
@@ -2213,7 +2846,12 @@ def get_orders(scrip_type):
     
     try:
         orders = orders_ce if scrip_type.upper() == 'CE' else orders_pe
-        return jsonify({'orders': orders})
+        # since=<revision>: only orders recorded after it
+        since = request.args.get('since', 0, type=int)
+        return conditional_json(('orders',), lambda: {
+            'orders': items_since(orders, since),
+            'revision': state_revisions.get('orders')
+        })
         
     except Exception as e:
         logger.error(f"Error getting orders: {str(e)}")
@@ -2224,9 +2862,14 @@ def get_orders(scrip_type):
 def get_combined_orders():
     global orders_ce, orders_pe
     
-    combined_orders = orders_ce + orders_pe
-    combined_orders.sort(key=lambda x: x['timestamp'], reverse=True)
-    return jsonify({'orders': combined_orders})
+    since = request.args.get('since', 0, type=int)
+    
+    def build():
+        combined_orders = items_since(orders_ce, since) + items_since(orders_pe, since)
+        combined_orders.sort(key=lambda x: x['timestamp'], reverse=True)
+        return {'orders': combined_orders, 'revision': state_revisions.get('orders')}
+    
+    return conditional_json(('orders',), build)
 
 
 @app.route('/api/trades/<scrip_type>')
@@ -2234,16 +2877,29 @@ def get_trades(scrip_type):
     global trades_ce, trades_pe
     
     trades = trades_ce if scrip_type.upper() == 'CE' else trades_pe
-    return jsonify({'trades': trades})
+    since = request.args.get('since', 0, type=int)
+    return conditional_json(('trades',), lambda: {
+        'trades': items_since(trades, since),
+        'revision': state_revisions.get('trades')
+    })
 
 
 @app.route('/api/trades/combined')
 def get_combined_trades():
     global trades_ce, trades_pe
     
-    combined_trades = trades_ce + trades_pe
-    combined_trades.sort(key=lambda x: x['exit_time'], reverse=True)
-    return jsonify({'trades': combined_trades})
+    since = request.args.get('since', 0, type=int)
+    # limit=<n>: only the n most recent
+    limit = request.args.get('limit', type=int)
+    
+    def build():
+        combined_trades = items_since(trades_ce, since) + items_since(trades_pe, since)
+        combined_trades.sort(key=lambda x: x['exit_time'], reverse=True)
+        if limit is not None and limit > 0:
+            combined_trades = combined_trades[:limit]
+        return {'trades': combined_trades, 'revision': state_revisions.get('trades')}
+    
+    return conditional_json(('trades',), build)
 
 
 @app.route('/api/start_trading', methods=['POST'])
@@ -2256,6 +2912,7 @@ def start_trading():
         scrip_update_in_progress = False
         trading_paused = False
         threading.Thread(target=trading_loop, daemon=True).start()
+        event_bus.publish('status', {'trading_active': True})
         return jsonify({'success': True, 'message': 'Trading started'})
     return jsonify({'success': False, 'message': 'Trading already active'})
 
@@ -2265,6 +2922,7 @@ def stop_trading():
     global trading_active
     
     trading_active = False
+    event_bus.publish('status', {'trading_active': False})
     return jsonify({'success': True, 'message': 'Trading stopped'})
 
 
@@ -2290,12 +2948,18 @@ def trading_config():
 
         for key in ['quantity', 'capital', 'stop_loss_percent', 'target_profit_percent', 'max_trades_per_day',
                     'trading_start_time', 'trading_end_time', 'broker', 'min_range_for_trading',
-                    'exchange', 'auto_scrip_update', 'price_difference_threshold', 'strategy_range']:
+                    'exchange', 'auto_scrip_update', 'price_difference_threshold', 'strategy_range', 'tick_interval']:
             if key in data:
                 if key in ['quantity', 'max_trades_per_day']:
                     config[key] = int(data[key])
                 elif key in ['capital', 'stop_loss_percent', 'target_profit_percent', 'min_range_for_trading', 'price_difference_threshold', 'strategy_range']:
                     config[key] = float(data[key])
+                elif key == 'tick_interval':
+                    interval = normalize_tick_interval(data[key])
+                    if interval is None:
+                        return jsonify({'success': False, 'message': f"Invalid tick interval: {data[key]}"}), 400
+                    config[key] = interval
+                    market_poller.scheduler.interval = interval
                 elif key == 'exchange':
                     if data[key] in VALID_EXCHANGES:
                         config[key] = data[key]
@@ -2315,11 +2979,14 @@ def trading_config():
         if 'capital' in data:
             portfolio_data['available_balance'] = config['capital']
             portfolio_data['free_margin'] = config['capital'] - portfolio_data['used_margin']
+            for trade_stats in trading_engine.trade_stats.values():
+                trade_stats.capital = config['capital']
 
+        state_revisions.bump('config')
         alert_manager.add_alert('config', 'Configuration Updated', 'Trading configuration has been updated', 'info')
         return jsonify({'success': True, 'message': 'Configuration updated'})
 
-    return jsonify(config)
+    return conditional_json(('config',), lambda: config)
 
 @app.route('/api/access_token', methods=['GET', 'POST'])
 def access_token_api():
@@ -2424,8 +3091,10 @@ def generate_scripmaster_csv_route():
         logger.info("Manual scripmaster generation requested via dashboard")
 
         # Call the helper that generates the CSV file. It should return True/False
-        # or raise on error depending on its implementation in scripupdate.py
-        result = generate_scripmaster_csv()
+        # or raise on error depending on its implementation in scripupdate.py.
+        # Same-day segment masters come from the local cache unless ?force=1.
+        force = request.args.get('force', '').lower() in ('1', 'true', 'yes')
+        result = generate_scripmaster_csv(use_cache=not force)
 
         # Attempt to reload the generated CSV into memory for the running app
         loaded = load_scrip_master_from_csv('scripmaster.csv')
@@ -2433,7 +3102,7 @@ def generate_scripmaster_csv_route():
         if result is True or result == 'ok' or loaded:
             msg = 'Scrip master generated and loaded successfully.' if loaded else 'Scrip master generated but failed to load.'
             alert_manager.add_alert('scrip_update', 'Scripmaster Updated', msg, 'success')
-            return jsonify({'success': True, 'message': msg})
+            return jsonify({'success': True, 'message': msg, 'timings': last_run_timings})
         else:
             msg = 'Scripmaster generation returned falsey result.'
             logger.warning(msg)
@@ -2446,75 +3115,81 @@ def generate_scripmaster_csv_route():
         return jsonify({'success': False, 'message': str(e)}), 500
 
 
+@app.route('/api/scripmaster/cache_status')
+def scripmaster_cache_status():
+    """Age and staleness of the locally cached segment scrip masters."""
+    try:
+        return jsonify({'segments': cache_status()})
+    except Exception as e:
+        logger.error(f"Error reading scripmaster cache status: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/analytics/pnl_chart')
 def get_pnl_chart():
-    global trades_ce, trades_pe
-    
-    all_trades = []
-    
-    for trade in trades_ce:
-        trade_copy = trade.copy()
-        trade_copy['scrip_type'] = 'CE'
-        all_trades.append(trade_copy)
-    
-    for trade in trades_pe:
-        trade_copy = trade.copy()
-        trade_copy['scrip_type'] = 'PE'
-        all_trades.append(trade_copy)
-    
-    all_trades.sort(key=lambda x: x['exit_time'])
-    
-    cumulative_pnl = 0
-    chart_data = []
+    # since/series: only points after the last one the client has
+    since = request.args.get('since', 0, type=int)
+    series_id = request.args.get('series')
+    max_points = request.args.get('max_points', type=int)
     
-    for trade in all_trades:
-        cumulative_pnl += trade['pnl']
-        chart_data.append({
-            'time': trade['exit_time'],
-            'pnl': trade['pnl'],
-            'cumulative_pnl': cumulative_pnl,
-            'scrip_type': trade['scrip_type']
-        })
+    chart_data, last_seq, reset = pnl_series.since(since, series_id, max_points)
     
-    return jsonify({'chart_data': chart_data})
+    return jsonify({
+        'chart_data': chart_data,
+        'seq': last_seq,
+        'series': pnl_series.series_id,
+        'reset': reset
+    })
 
 
 @app.route('/api/analytics/trade_distribution')
 def get_trade_distribution():
+    return conditional_json(('trades',), build_trade_distribution)
+
+
+def build_trade_distribution():
     global ce_stats, pe_stats
     
-    return jsonify({
+    return {
         'ce_trades': ce_stats['total_trades'],
         'pe_trades': pe_stats['total_trades'],
         'ce_wins': ce_stats['win_trades'],
         'pe_wins': pe_stats['win_trades'],
         'ce_losses': ce_stats['lose_trades'],
         'pe_losses': pe_stats['lose_trades']
-    })
+    }
 
 
 @app.route('/api/analytics/performance_metrics')
 def get_performance_metrics():
+    return conditional_json(('trades', 'config'), build_performance_metrics)
+
+
+def build_performance_metrics():
     global ce_stats, pe_stats, config
     
-    total_trades = ce_stats['total_trades'] + pe_stats['total_trades']
-    total_wins = ce_stats['win_trades'] + pe_stats['win_trades']
-    total_losses = ce_stats['lose_trades'] + pe_stats['lose_trades']
+    trade_stats = trading_engine.trade_stats['COMBINED']
+    total_pnl = ce_stats['net_profit'] + pe_stats['net_profit']
     
     metrics = {
-        'total_trades': total_trades,
-        'win_rate': (total_wins / total_trades * 100) if total_trades > 0 else 0,
-        'total_pnl': ce_stats['net_profit'] + pe_stats['net_profit'],
-        'max_drawdown': min(ce_stats['max_loss'], pe_stats['max_loss']),
-        'profit_factor': (ce_stats['profit_factor'] + pe_stats['profit_factor']) / 2 if ce_stats['profit_factor'] > 0 and pe_stats['profit_factor'] > 0 else 0,
-        'sharpe_ratio': 0,
-        'max_consecutive_wins': max(ce_stats['consecutive_wins'], pe_stats['consecutive_wins']),
-        'max_consecutive_losses': max(ce_stats['consecutive_losses'], pe_stats['consecutive_losses']),
-        'avg_trade_pnl': ((ce_stats['net_profit'] + pe_stats['net_profit']) / total_trades) if total_trades > 0 else 0,
-        'roi': ((ce_stats['net_profit'] + pe_stats['net_profit']) / config['capital'] * 100) if config['capital'] > 0 else 0
+        'total_trades': trade_stats.total_trades,
+        'win_rate': trade_stats.win_rate,
+        'total_pnl': total_pnl,
+        # Shown as a negative amount on the dashboard
+        'max_drawdown': -trade_stats.max_drawdown,
+        'profit_factor': trade_stats.profit_factor,
+        'max_drawdown_pct': round(trade_stats.max_drawdown_pct, 2),
+        'max_drawdown_duration': round(trade_stats.max_drawdown_duration, 1),
+        'sharpe_ratio': round(trade_stats.sharpe_ratio, 4),
+        'sortino_ratio': round(trade_stats.sortino_ratio, 4),
+        'max_consecutive_wins': trade_stats.max_consecutive_wins,
+        'max_consecutive_losses': trade_stats.max_consecutive_losses,
+        'avg_trade_pnl': trade_stats.mean_pnl,
+        'roi': (total_pnl / config['capital'] * 100) if config['capital'] > 0 else 0,
+        'legs': {leg: stats.risk_metrics() for leg, stats in trading_engine.trade_stats.items()}
     }
     
-    return jsonify(metrics)
+    return metrics
 
 
 @app.route('/api/index_ltp', methods=['GET'])
@@ -2534,8 +3209,84 @@ def index_ltp():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/http_stats')
+def http_stats():
+    """Connection pool statistics per shared HTTP client, plus the I/O core's per-host counters."""
+    stats = httpclient.pool_stats()
+    stats['io_core'] = io_core.stats()
+    return jsonify(stats)
+
+
+@app.route('/api/tick_stats')
+def tick_stats():
+    """Tick scheduler metrics (overruns, skipped ticks, start jitter) and per-leg skipped ticks."""
+    stats = market_poller.scheduler.stats()
+    stats['legs'] = {leg: {'skipped_ticks': worker.skipped_ticks} for leg, worker in leg_workers.items()}
+    return jsonify(stats)
+
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    """The dashboard view precomputed for the latest tick; ``fields=market,stats`` selects sections."""
+    fields = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in fields if name not in SNAPSHOT_FIELDS]
+    if unknown:
+        return jsonify({'error': f"Unknown fields: {', '.join(unknown)}", 'fields': list(SNAPSHOT_FIELDS)}), 400
+
+    market_poller.touch()
+    current_snapshot()
+    version, body = dashboard_snapshot.encoded(fields)
+    etag = f"{state_revisions.boot_id}-snapshot.{version}-{'.'.join(sorted(fields)) or 'all'}"
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+@app.route('/api/stream')
+def event_stream():
+    """Server-Sent Events: tick, order, trade, alert, scrip_update and status events."""
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    try:
+        subscription = event_bus.subscribe(last_event_id)
+    except SubscriberLimitReached:
+        logger.warning(f"Refusing event stream: {event_bus.subscriber_count} subscribers connected")
+        response = jsonify({'error': 'Too many event stream subscribers; poll instead'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '30'
+        return response
+    market_poller.start()
+    market_poller.touch()
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            # Current state first, so the client can render without polling
+            snapshot = current_snapshot()
+            yield EventBus.format(None, 'tick', {name: snapshot[name] for name in TICK_FIELDS})
+            while not subscription.closed:
+                market_poller.touch()
+                frame = subscription.get(timeout=15)
+                yield frame if frame is not None else ': keep-alive\n\n'
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+
 @app.route('/api/positions/current')
 def get_current_positions():
+    return conditional_json(('stats', 'orders', 'config'), lambda: {'positions': build_positions()})
+
+
+def build_positions():
+    """Open positions with their live P&L."""
     global current_position_ce, current_position_pe, config, ce_stats, pe_stats
     
     positions = []
@@ -2545,7 +3296,7 @@ def get_current_positions():
             'scrip_type': 'CE',
             'scrip_code': config['ce_scrip_code'],
             'side': current_position_ce,
-            'quantity': config['quantity'],
+            'quantity': ce_stats['quantity'],
             'entry_price': ce_stats['entry_price'],
             'current_price': ce_stats['current_price'],
             'pnl': ce_stats['unrealized_pnl'],
@@ -2557,14 +3308,14 @@ def get_current_positions():
             'scrip_type': 'PE',
             'scrip_code': config['pe_scrip_code'],
             'side': current_position_pe,
-            'quantity': config['quantity'],
+            'quantity': pe_stats['quantity'],
             'entry_price': pe_stats['entry_price'],
             'current_price': pe_stats['current_price'],
             'pnl': pe_stats['unrealized_pnl'],
             'entry_time': datetime.now().isoformat()
         })
     
-    return jsonify({'positions': positions})
+    return positions
 
 
 # ============================================================================
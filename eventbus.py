@@ -0,0 +1,105 @@
+import json
+import queue
+import threading
+import time
+from collections import deque
+
+
+class SubscriberLimitReached(Exception):
+    """Raised by ``EventBus.subscribe`` when ``max_subscribers`` are already connected."""
+
+
+class Subscription:
+    """One subscriber's queue of pre-formatted SSE frames."""
+
+    def __init__(self, maxsize):
+        self._queue = queue.Queue(maxsize)
+        self.closed = False
+
+    def put(self, frame):
+        if self.closed:
+            return
+        try:
+            self._queue.put_nowait(frame)
+        except queue.Full:
+            # A consumer this far behind reconnects and replays from history
+            self.closed = True
+
+    def get(self, timeout=None):
+        """Next frame, or None if none arrived within ``timeout`` seconds."""
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    """Fan-out of server events to Server-Sent Events subscribers.
+
+    Each event is serialized once at publish time and the same frame is
+    queued for every subscriber. The last ``history`` frames are kept so a
+    reconnecting client (``Last-Event-ID``) can replay what it missed; a
+    client too far behind gets a ``resync`` event instead. Event ids start
+    from the boot time in milliseconds so they keep increasing across
+    restarts. Each subscriber holds a server thread for as long as it is
+    connected, so ``max_subscribers`` (None for no limit) caps them.
+    """
+
+    def __init__(self, history=256, queue_size=256, max_subscribers=None):
+        self._lock = threading.Lock()
+        self.max_subscribers = max_subscribers
+        self._subscribers = set()
+        self._history = deque(maxlen=history)
+        self._queue_size = queue_size
+        self._next_id = int(time.time() * 1000)
+
+    @property
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    @staticmethod
+    def format(event_id, event_type, data):
+        payload = json.dumps(data, default=str, separators=(',', ':'))
+        prefix = f"id: {event_id}\n" if event_id is not None else ''
+        return f"{prefix}event: {event_type}\ndata: {payload}\n\n"
+
+    def publish(self, event_type, data):
+        """Queue ``data`` as an ``event_type`` event for every subscriber; returns its id."""
+        with self._lock:
+            event_id = self._next_id
+            self._next_id += 1
+            frame = (event_id, self.format(event_id, event_type, data))
+            self._history.append(frame)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.put(frame[1])
+        return event_id
+
+    def subscribe(self, last_event_id=None):
+        """Register a subscriber, replaying events after ``last_event_id`` if given.
+
+        Raises ``SubscriberLimitReached`` when ``max_subscribers`` are connected.
+        """
+        subscription = Subscription(self._queue_size)
+        with self._lock:
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                raise SubscriberLimitReached(f"{len(self._subscribers)} subscribers connected")
+            if last_event_id is not None:
+                oldest = self._history[0][0] if self._history else self._next_id
+                if last_event_id + 1 < oldest or last_event_id >= self._next_id:
+                    subscription.put(self.format(None, 'resync', {}))
+                else:
+                    for event_id, frame in self._history:
+                        if event_id > last_event_id:
+                            subscription.put(frame)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
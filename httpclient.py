@@ -0,0 +1,167 @@
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class JitterRetry(Retry):
+    """urllib3 Retry with full jitter on the exponential backoff."""
+
+    def get_backoff_time(self):
+        backoff = super().get_backoff_time()
+        return random.uniform(0, backoff) if backoff > 0 else 0
+
+
+class HostClient:
+    """Keep-alive session with its own connection pool, timeouts and retry policy.
+
+    One client is shared per remote host so repeated calls reuse the same
+    TCP/TLS connections instead of paying a fresh handshake each time.
+    """
+
+    def __init__(self, name, timeout, retry, pool_maxsize=4):
+        self.name = name
+        self.timeout = timeout
+        self.pool_maxsize = pool_maxsize
+        self.session = requests.Session()
+        self.adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retry)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._errors = 0
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        with self._lock:
+            self._requests += 1
+        try:
+            return self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            with self._lock:
+                self._errors += 1
+            raise
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def stats(self):
+        """Return pool statistics: requests sent, handshakes (new connections) and reuse ratio."""
+        hosts = {}
+        pools = self.adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            hosts[pool.host] = {
+                'requests': pool.num_requests,
+                'handshakes': pool.num_connections
+            }
+
+        pool_requests = sum(h['requests'] for h in hosts.values())
+        handshakes = sum(h['handshakes'] for h in hosts.values())
+        return {
+            'requests': self._requests,
+            'errors': self._errors,
+            'handshakes': handshakes,
+            'reuse_ratio': round(1 - handshakes / pool_requests, 4) if pool_requests else 0,
+            'hosts': hosts
+        }
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate`` tokens per second, bursts up to ``capacity``."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Consume ``tokens`` if available and return 0, else return the seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available, then consume them."""
+        while True:
+            wait = self.reserve(tokens)
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self, tokens=1):
+        """Like ``acquire`` but waits with ``asyncio.sleep`` instead of blocking the thread."""
+        while True:
+            wait = self.reserve(tokens)
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+
+# Market feed reads are idempotent, so connect/read failures and gateway
+# errors are retried a couple of times with jittered backoff.
+market_data = HostClient(
+    'market_data',
+    timeout=(2, 5),
+    retry=JitterRetry(
+        total=2, connect=2, read=2, status=2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET', 'POST']),
+        backoff_factor=0.1,
+        raise_on_status=False
+    ),
+    pool_maxsize=8
+)
+
+# Orders are only retried when the connection could not be established:
+# once a request may have reached the broker, replaying it could double a
+# market order.
+orders = HostClient(
+    'orders',
+    timeout=(3, 10),
+    retry=JitterRetry(
+        total=2, connect=2, read=0, status=0, other=0,
+        backoff_factor=0.05,
+        raise_on_status=False
+    ),
+    pool_maxsize=4
+)
+
+scrip_master = HostClient(
+    'scrip_master',
+    timeout=(5, 60),
+    retry=JitterRetry(
+        total=2, connect=2, read=1, status=2,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        backoff_factor=0.5,
+        raise_on_status=False
+    ),
+    pool_maxsize=2
+)
+
+# Shared cap on MarketFeed requests across the poller, scans and routes
+market_feed_limiter = TokenBucket(rate=10, capacity=5)
+
+CLIENTS = {client.name: client for client in (market_data, orders, scrip_master)}
+
+
+def pool_stats():
+    """Return connection pool statistics for every shared client."""
+    return {name: client.stats() for name, client in CLIENTS.items()}
@@ -0,0 +1,184 @@
+from bisect import bisect_left
+from collections import OrderedDict
+
+
+def calculate_smma(data, period):
+    """Single-value RMA (Wilder's Moving Average) over the whole series.
+
+    The first ``period`` values seed an SMA, the rest are folded in with the
+    Wilder recursion. Returns None when there is not enough data.
+    """
+    if len(data) < period:
+        return None
+
+    data_list = list(data)
+    rma = sum(data_list[:period]) / period  # initial SMA
+
+    for price in data_list[period:]:
+        rma = (rma * (period - 1) + price) / period
+
+    return rma
+
+
+class _SMMAState:
+    """Running RMA for one period over a bounded history."""
+
+    __slots__ = ('period', 'rma', 'seed_sum', 'decay', 'updates')
+
+    def __init__(self, history, period):
+        self.period = period
+        # Weight of the seed SMA in the final value once the window is full
+        self.decay = ((period - 1) / period) ** (history.maxlen - period) if history.maxlen >= period else 0
+        self.resync(history)
+
+    def resync(self, history):
+        """Recompute from scratch; also used periodically to shed float drift."""
+        seed = [history[i] for i in range(min(len(history), self.period))]
+        self.seed_sum = sum(seed)
+        self.rma = calculate_smma(history, self.period)
+        self.updates = 0
+
+    def push(self, history, price, dropped):
+        """Fold in ``price`` (already appended). ``dropped`` is the value evicted by it, if any."""
+        period = self.period
+        length = len(history)
+
+        if dropped is None:
+            if length <= period:
+                self.seed_sum += price
+                if length == period:
+                    self.rma = self.seed_sum / period
+            else:
+                self.rma = (self.rma * (period - 1) + price) / period
+        elif self.rma is not None:
+            # The window slid by one: the oldest seed value left and the next
+            # value joined the seed SMA, which shifts every weight in the sum.
+            old_seed = self.seed_sum
+            self.seed_sum = old_seed - dropped + history[period - 1]
+            alpha = (period - 1) / period
+            self.rma = (
+                alpha * self.rma + price / period
+                + self.decay / period * ((old_seed - dropped) - alpha * old_seed)
+            )
+
+        self.updates += 1
+        if self.updates >= history.maxlen:
+            self.resync(history)
+
+
+class SMMAEngine:
+    """Incremental SMMA/RMA values for a price history and several periods.
+
+    The engine owns appends to ``history`` (a bounded sequence with
+    ``maxlen``, such as ``PriceHistory``) so it can see evicted values. Each tracked period costs O(1) per append and
+    gives the same result as ``calculate_smma(history, period)``. A period is
+    computed in full the first time it is asked for and tracked from then on;
+    only the ``max_periods`` most recently used periods are kept.
+    """
+
+    def __init__(self, history, max_periods=8):
+        self.history = history
+        self.max_periods = max_periods
+        self._states = OrderedDict()
+
+    def append(self, price):
+        history = self.history
+        dropped = history[0] if history.maxlen is not None and len(history) == history.maxlen else None
+        history.append(price)
+        for state in self._states.values():
+            state.push(history, price, dropped)
+
+    def value(self, period):
+        """Current SMMA for ``period``, or None while the history is shorter than it."""
+        if period <= 0:
+            return None
+        state = self._states.get(period)
+        if state is None:
+            state = _SMMAState(self.history, period)
+            self._states[period] = state
+            if len(self._states) > self.max_periods:
+                self._states.popitem(last=False)
+        else:
+            self._states.move_to_end(period)
+        return state.rma
+
+    def invalidate(self):
+        """Forget all running state after the history was modified in place."""
+        self._states.clear()
+
+
+class _MonotonicStack:
+    """Indices of suffix maxima of ``sign * value``, oldest first."""
+
+    __slots__ = ('sign', 'indices', 'values', 'head')
+
+    def __init__(self, sign):
+        self.sign = sign
+        self.indices = []
+        self.values = []
+        self.head = 0
+
+    def push(self, index, value):
+        value *= self.sign
+        indices, values = self.indices, self.values
+        while len(values) > self.head and values[-1] <= value:
+            indices.pop()
+            values.pop()
+        indices.append(index)
+        values.append(value)
+
+    def evict_before(self, oldest):
+        indices = self.indices
+        while self.head < len(indices) and indices[self.head] < oldest:
+            self.head += 1
+        # Compact occasionally so the lists stay bounded by the window size
+        if self.head > 64 and self.head * 2 > len(indices):
+            del self.indices[:self.head]
+            del self.values[:self.head]
+            self.head = 0
+
+    def best_since(self, start):
+        pos = bisect_left(self.indices, start, self.head)
+        return self.sign * self.values[pos]
+
+
+class RollingExtremes:
+    """Rolling high/low over any trailing window of a bounded price history.
+
+    Mirrors appends to a history of ``maxlen`` values. Appends are amortized
+    O(1) and ``high_low(window)`` answers any window up to ``maxlen`` in
+    O(log n) without copying the history.
+    """
+
+    def __init__(self, maxlen):
+        self.maxlen = maxlen
+        self.reset()
+
+    def reset(self, values=()):
+        """Rebuild from ``values`` (e.g. after the history was rescaled)."""
+        self.count = 0
+        self._max = _MonotonicStack(1)
+        self._min = _MonotonicStack(-1)
+        for value in values:
+            self.append(value)
+
+    def __len__(self):
+        return min(self.count, self.maxlen)
+
+    def append(self, price):
+        index = self.count
+        self.count += 1
+        self._max.push(index, price)
+        self._min.push(index, price)
+        oldest = self.count - self.maxlen
+        if oldest > 0:
+            self._max.evict_before(oldest)
+            self._min.evict_before(oldest)
+
+    def high_low(self, window):
+        """(high, low) over the last ``window`` values, or (None, None) when empty."""
+        size = min(window, len(self))
+        if size <= 0:
+            return None, None
+        start = self.count - size
+        return self._max.best_since(start), self._min.best_since(start)
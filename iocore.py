@@ -0,0 +1,129 @@
+import asyncio
+import concurrent.futures
+import functools
+import threading
+
+
+class IOCore:
+    """Asyncio event loop on its own thread for broker and market-feed I/O.
+
+    Coroutines can be submitted from any thread: ``submit`` returns a
+    ``concurrent.futures.Future`` and ``run`` blocks on the result, cancelling
+    the coroutine on timeout. HTTP calls go through ``request``, which caps
+    in-flight requests per host client with a semaphore and applies a
+    timeout; requests waiting for a slot are coroutines, not threads.
+
+    This only caps concurrency; it does not make the sends non-blocking. The
+    transport is still the shared keep-alive ``httpclient.HostClient`` (its
+    connection pools and retry policies), whose blocking send runs on an
+    executor thread, so every in-flight request holds one OS thread. The
+    executor is sized to the sum of the per-host limits and a host's slot is
+    held until its send returns, so the thread count never exceeds that sum
+    and one host can never occupy another's threads.
+    """
+
+    def __init__(self, limits, name='io-core'):
+        self.name = name
+        self._limits = dict(limits)
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._semaphores = {}
+        # One thread per host slot: never more than the semaphores admit at once
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(1, sum(self._limits.values())),
+            thread_name_prefix=f'{name}-send'
+        )
+        self._stats = {
+            host: {'in_flight': 0, 'waiting': 0, 'completed': 0, 'errors': 0, 'timeouts': 0}
+            for host in self._limits
+        }
+
+    def start(self):
+        """Start the event loop thread if needed and return the loop."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                ready = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(ready,), name=self.name, daemon=True)
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def _run(self, ready):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._semaphores = {host: asyncio.Semaphore(limit) for host, limit in self._limits.items()}
+        ready.set()
+        loop.run_forever()
+
+    def submit(self, coro):
+        """Schedule ``coro`` on the I/O loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.start())
+
+    def run(self, coro, timeout=None):
+        """Run ``coro`` on the I/O loop and wait for its result.
+
+        Raises ``concurrent.futures.TimeoutError`` (after cancelling the
+        coroutine) when ``timeout`` seconds pass first.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('IOCore.run called from the I/O loop; await the coroutine instead')
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            future.cancel()
+            raise
+
+    async def request(self, client, method, url, timeout=None, **kwargs):
+        """Send ``method url`` through ``client`` within its host's concurrency limit.
+
+        ``timeout`` bounds the whole call, including retries done by the
+        client; on expiry ``asyncio.TimeoutError`` is raised. The blocking
+        send cannot be interrupted, so the host slot (and its in-flight
+        count) stays taken until the executor thread actually finishes.
+        """
+        stats = self._stats[client.name]
+        semaphore = self._semaphores[client.name]
+        stats['waiting'] += 1
+        try:
+            await semaphore.acquire()
+        finally:
+            stats['waiting'] -= 1
+
+        stats['in_flight'] += 1
+        loop = asyncio.get_running_loop()
+        send = functools.partial(client.request, method, url, **kwargs)
+        try:
+            future = loop.run_in_executor(self._executor, send)
+        except BaseException:
+            stats['in_flight'] -= 1
+            semaphore.release()
+            raise
+
+        def release(_):
+            stats['in_flight'] -= 1
+            semaphore.release()
+
+        future.add_done_callback(release)
+        try:
+            # Shielded so a timeout or cancellation only stops the wait;
+            # the send keeps its slot until ``release`` runs
+            response = await asyncio.wait_for(asyncio.shield(future), timeout)
+            stats['completed'] += 1
+            return response
+        except asyncio.TimeoutError:
+            stats['timeouts'] += 1
+            raise
+        except Exception:
+            stats['errors'] += 1
+            raise
+
+    def stats(self):
+        """Per-host limits and counters (waiting, in flight, completed, errors, timeouts)."""
+        return {
+            host: dict(self._stats[host], limit=limit)
+            for host, limit in self._limits.items()
+        }
@@ -0,0 +1,359 @@
+import csv
+import os
+import re
+import sqlite3
+import threading
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+CSV_COLUMNS = ['Date', 'Time', 'Scrip Name', 'Scrip Type', 'Quantity', 'Price', 'Value', 'PNL']
+
+SYNC_MODES = ('OFF', 'NORMAL', 'FULL')
+
+_COLUMNS = ('id', 'date', 'time', 'scrip_name', 'scrip_type', 'quantity', 'price', 'value', 'pnl')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,
+    time TEXT NOT NULL,
+    scrip_name TEXT NOT NULL,
+    scrip_type TEXT NOT NULL,
+    quantity INTEGER NOT NULL,
+    price REAL NOT NULL,
+    value REAL NOT NULL,
+    pnl REAL
+);
+CREATE INDEX IF NOT EXISTS orders_date ON orders (date);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _parse_csv_date(value):
+    """Order history dates were written as DD-MM-YYYY and later YYYY-MM-DD."""
+    for fmt in ('%Y-%m-%d', '%d-%m-%Y'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return None
+
+
+class OrderJournal:
+    """Append-only order log in a SQLite database running in WAL mode.
+
+    One connection stays open for the life of the process, so recording an
+    order is a single INSERT and commit. ``synchronous`` chooses the fsync
+    policy: FULL syncs the WAL on every commit, NORMAL (the default) only at
+    checkpoints, OFF leaves it to the OS. Rows get increasing ids, so readers
+    can tail the journal with ``rows(after_id=...)``.
+    """
+
+    def __init__(self, path, legacy_csv=None, synchronous='NORMAL'):
+        synchronous = synchronous.upper()
+        if synchronous not in SYNC_MODES:
+            raise ValueError(f"synchronous must be one of {SYNC_MODES}")
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(f'PRAGMA synchronous={synchronous}')
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+        if legacy_csv:
+            self.import_csv(legacy_csv)
+
+    def import_csv(self, csv_path):
+        """Import a legacy order_history.csv once; returns the number of rows added."""
+        if not os.path.exists(csv_path):
+            return 0
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'imported_csv'"
+            ).fetchone()
+            if done is not None:
+                return 0
+
+            rows = []
+            with open(csv_path, newline='') as file:
+                for record in csv.DictReader(file):
+                    date_str = _parse_csv_date(record.get('Date') or '')
+                    if date_str is None:
+                        continue
+                    quantity = int(float(record['Quantity']))
+                    price = float(record['Price'])
+                    value = record.get('Value')
+                    pnl = record.get('PNL')
+                    rows.append((
+                        date_str, record['Time'], record['Scrip Name'], record['Scrip Type'],
+                        quantity, price,
+                        float(value) if value else quantity * price,
+                        float(pnl) if pnl else None
+                    ))
+
+            with self._conn:
+                self._conn.executemany(
+                    'INSERT INTO orders (date, time, scrip_name, scrip_type, quantity, price, value, pnl) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    rows
+                )
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('imported_csv', ?)",
+                    (os.path.abspath(csv_path),)
+                )
+            return len(rows)
+
+    def append(self, scrip_name, scrip_type, qty, price, pnl=0, when=None):
+        """Record one order and return it as a history record (see ``rows``)."""
+        when = when or datetime.now()
+        row = (when.strftime('%Y-%m-%d'), when.strftime('%H:%M:%S'), scrip_name, scrip_type,
+               qty, price, qty * price, pnl)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO orders (date, time, scrip_name, scrip_type, quantity, price, value, pnl) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                row
+            )
+            return self._record(dict(zip(_COLUMNS, (cursor.lastrowid,) + row)))
+
+    @property
+    def last_id(self):
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM orders').fetchone()[0]
+
+    def rows(self, after_id=0, limit=None):
+        """Orders with id greater than ``after_id``, oldest first."""
+        sql = 'SELECT * FROM orders WHERE id > ? ORDER BY id'
+        params = [after_id]
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        with self._lock:
+            return [self._record(row) for row in self._conn.execute(sql, params)]
+
+    def export_csv(self, file):
+        """Write the whole journal to ``file`` in the order_history.csv layout."""
+        writer = csv.writer(file)
+        writer.writerow(CSV_COLUMNS)
+        with self._lock:
+            for row in self._conn.execute('SELECT * FROM orders ORDER BY id'):
+                writer.writerow([
+                    row['date'], row['time'], row['scrip_name'], row['scrip_type'],
+                    row['quantity'], row['price'], row['value'],
+                    '' if row['pnl'] is None else row['pnl']
+                ])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _record(row):
+        return {
+            'id': row['id'],
+            'Date': row['date'],
+            'Time': row['time'],
+            'Scrip Name': row['scrip_name'],
+            'Scrip Type': row['scrip_type'],
+            'Quantity': row['quantity'],
+            'Price': row['price'],
+            'Value': row['value'],
+            'PNL': '' if row['pnl'] is None else row['pnl']
+        }
+
+
+def _name_tokens(scrip_name):
+    """Upper-cased words of a scrip name; strikes also index without their decimals."""
+    tokens = set()
+    for token in scrip_name.upper().split():
+        tokens.add(token)
+        if re.fullmatch(r'\d+\.0+', token):
+            tokens.add(token.split('.')[0])
+    return tokens
+
+
+def _new_day_summary(date_str):
+    return {
+        'date': date_str,
+        'orders': 0,
+        'buy_orders': 0,
+        'sell_orders': 0,
+        'quantity': 0,
+        'turnover': 0.0,
+        'pnl': 0.0,
+        'winning_orders': 0,
+        'losing_orders': 0
+    }
+
+
+class TradeHistoryIndex:
+    """In-memory query index over journal records for the trade-history view.
+
+    Records are kept in journal id order and indexed three ways: date
+    partitions (a sorted list of days, each holding its record positions),
+    an inverted index from scrip-name tokens ("NIFTY", "PE", "25900") to
+    positions, and a per-type index. A query walks the smallest matching
+    position list from the cursor and stops after ``limit`` hits, so the cost
+    tracks the page size rather than the size of the journal. Per-day totals
+    are maintained as records are added.
+    """
+
+    def __init__(self, records=()):
+        self._lock = threading.Lock()
+        self._records = []
+        self._ids = []
+        self._days = {}
+        self._day_keys = []
+        self._in_date_order = True
+        self._tokens = {}
+        self._types = {}
+        self._summaries = {}
+        for record in records:
+            self._add(record)
+
+    def __len__(self):
+        return len(self._records)
+
+    def add(self, record):
+        """Index a record just appended to the journal."""
+        with self._lock:
+            self._add(record)
+
+    def _add(self, record):
+        if self._ids and record['id'] <= self._ids[-1]:
+            raise ValueError('records must be added in increasing id order')
+        position = len(self._records)
+        self._records.append(record)
+        self._ids.append(record['id'])
+
+        date_str = record['Date']
+        day = self._days.get(date_str)
+        if day is None:
+            if self._day_keys and date_str < self._day_keys[-1]:
+                self._in_date_order = False
+            day = self._days[date_str] = []
+            insort(self._day_keys, date_str)
+        day.append(position)
+
+        for token in _name_tokens(record['Scrip Name']):
+            self._tokens.setdefault(token, []).append(position)
+        self._types.setdefault(record['Scrip Type'].upper(), []).append(position)
+
+        summary = self._summaries.get(date_str)
+        if summary is None:
+            summary = self._summaries[date_str] = _new_day_summary(date_str)
+        summary['orders'] += 1
+        if record['Scrip Type'].upper() == 'BUY':
+            summary['buy_orders'] += 1
+        elif record['Scrip Type'].upper() == 'SELL':
+            summary['sell_orders'] += 1
+        summary['quantity'] += record['Quantity']
+        summary['turnover'] += record['Value']
+        pnl = record['PNL']
+        if pnl != '':
+            summary['pnl'] += pnl
+            if pnl > 0:
+                summary['winning_orders'] += 1
+            elif pnl < 0:
+                summary['losing_orders'] += 1
+
+    def _date_positions(self, from_date, to_date):
+        lo = bisect_left(self._day_keys, from_date) if from_date else 0
+        hi = bisect_right(self._day_keys, to_date) if to_date else len(self._day_keys)
+        positions = []
+        for date_str in self._day_keys[lo:hi]:
+            positions.extend(self._days[date_str])
+        if not self._in_date_order:
+            positions.sort()
+        return positions
+
+    def _name_positions(self, scrip_name):
+        """Positions that can match a name substring, narrowed by token postings."""
+        best = None
+        for word in scrip_name.upper().split():
+            postings = [positions for token, positions in self._tokens.items() if word in token]
+            size = sum(len(positions) for positions in postings)
+            if best is None or size < best[0]:
+                best = (size, postings)
+        if best is None:
+            return None
+        postings = best[1]
+        if len(postings) == 1:
+            return postings[0]
+        return sorted(set().union(*postings))
+
+    def query(self, from_date=None, to_date=None, scrip_name=None, scrip_type=None,
+              pnl_min=None, pnl_max=None, cursor=None, limit=None, descending=False):
+        """Return ``(records, next_cursor)`` for the filters, in id order.
+
+        ``cursor`` is a journal id: results start strictly after it (before it
+        when ``descending``). ``next_cursor`` is None once the last page has
+        been returned.
+        """
+        needle = scrip_name.upper() if scrip_name else None
+        kind = scrip_type.upper() if scrip_type else None
+
+        def matches(record):
+            if from_date and record['Date'] < from_date:
+                return False
+            if to_date and record['Date'] > to_date:
+                return False
+            if kind and record['Scrip Type'].upper() != kind:
+                return False
+            if needle and needle not in record['Scrip Name'].upper():
+                return False
+            if pnl_min is not None or pnl_max is not None:
+                pnl = record['PNL']
+                if pnl == '':
+                    return False
+                if pnl_min is not None and pnl < pnl_min:
+                    return False
+                if pnl_max is not None and pnl > pnl_max:
+                    return False
+            return True
+
+        with self._lock:
+            candidates = []
+            if from_date or to_date:
+                candidates.append(self._date_positions(from_date, to_date))
+            if kind:
+                candidates.append(self._types.get(kind, []))
+            if needle and needle.strip():
+                candidates.append(self._name_positions(needle))
+            driver = min(candidates, key=len) if candidates else range(len(self._records))
+
+            # Translate the id cursor into a slice of the driving position list
+            if cursor is not None:
+                start = bisect_right(self._ids, cursor) if not descending else bisect_left(self._ids, cursor)
+                cut = bisect_left(driver, start)
+                driver = driver[cut:] if not descending else driver[:cut]
+            positions = reversed(driver) if descending else iter(driver)
+
+            results = []
+            exhausted = True
+            for position in positions:
+                record = self._records[position]
+                if not matches(record):
+                    continue
+                if limit is not None and len(results) >= limit:
+                    exhausted = False
+                    break
+                results.append(record)
+
+        next_cursor = None if exhausted or not results else results[-1]['id']
+        return results, next_cursor
+
+    def daily_summary(self, from_date=None, to_date=None):
+        """Per-day order counts, turnover and realised P&L, oldest day first."""
+        with self._lock:
+            lo = bisect_left(self._day_keys, from_date) if from_date else 0
+            hi = bisect_right(self._day_keys, to_date) if to_date else len(self._day_keys)
+            summaries = [dict(self._summaries[date_str]) for date_str in self._day_keys[lo:hi]]
+        for summary in summaries:
+            summary['turnover'] = round(summary['turnover'], 2)
+            summary['pnl'] = round(summary['pnl'], 2)
+        return summaries
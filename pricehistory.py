@@ -0,0 +1,70 @@
+import numpy as np
+
+
+class PriceHistory:
+    """Fixed-capacity ring buffer of prices.
+
+    Prices are a float64 NumPy array stored twice over (each slot is written
+    at ``i`` and ``i + capacity``), so any trailing window is one contiguous
+    slice and ``window()`` can return a view instead of a copy.
+    The sequence interface (len, indexing, iteration, ``append``, ``maxlen``)
+    matches the ``deque(maxlen=...)`` it replaces.
+    """
+
+    def __init__(self, capacity=600):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._prices = np.zeros(2 * capacity, dtype=np.float64)
+        self._start = 0
+        self._length = 0
+
+    @property
+    def maxlen(self):
+        return self.capacity
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("PriceHistory index out of range")
+        return float(self._prices[self._start + index])
+
+    def __iter__(self):
+        return iter(self.window().tolist())
+
+    def append(self, price):
+        capacity = self.capacity
+        if self._length < capacity:
+            slot = (self._start + self._length) % capacity
+            self._length += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % capacity
+        self._prices[slot] = self._prices[slot + capacity] = price
+
+    def extend(self, prices):
+        for price in prices:
+            self.append(price)
+
+    def clear(self):
+        self._start = 0
+        self._length = 0
+
+    def window(self, size=None):
+        """Zero-copy read-only view of the last ``size`` prices, oldest first."""
+        size = self._length if size is None else max(0, min(size, self._length))
+        begin = self._start + self._length - size
+        view = self._prices[begin:begin + size]
+        view.flags.writeable = False
+        return view
+
+    def rescale(self, factor, floor=None):
+        """Multiply every stored price by ``factor`` in place, clamping at ``floor``."""
+        prices = self._prices
+        prices *= factor
+        if floor is not None:
+            np.maximum(prices, floor, out=prices)
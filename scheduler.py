@@ -0,0 +1,94 @@
+import math
+import threading
+import time
+from collections import deque
+
+
+class TickScheduler:
+    """Fixed-rate ticks on the monotonic clock.
+
+    Tick ``n`` is due at ``start + n * interval`` however long the previous
+    tick's work took, so the period does not drift. When work overruns one
+    or more whole periods the missed ticks are skipped rather than run back
+    to back, and the schedule resumes on the next grid point. Jitter (how
+    late each tick actually started) is recorded for every tick.
+    """
+
+    def __init__(self, interval, clock=time.monotonic, sleep=time.sleep, jitter_window=600):
+        if not math.isfinite(interval) or interval <= 0:
+            raise ValueError("interval must be positive and finite")
+        self._lock = threading.Lock()
+        self._interval = float(interval)
+        self._clock = clock
+        self._sleep = sleep
+        self._next = None
+        self._recent = deque(maxlen=jitter_window)
+        self._jitter_sum = 0.0
+        self.ticks = 0
+        self.overruns = 0
+        self.skipped_ticks = 0
+        self.last_jitter = 0.0
+        self.max_jitter = 0.0
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @interval.setter
+    def interval(self, interval):
+        """Change the period; the schedule re-anchors on the next tick."""
+        if not math.isfinite(interval) or interval <= 0:
+            raise ValueError("interval must be positive and finite")
+        with self._lock:
+            if float(interval) != self._interval:
+                self._interval = float(interval)
+                self._next = None
+
+    def wait(self):
+        """Sleep until the next tick is due; returns its scheduled monotonic time."""
+        with self._lock:
+            now = self._clock()
+            if self._next is None:
+                self._next = now
+            interval = self._interval
+            scheduled = self._next
+        delay = scheduled - now
+        if delay > 0:
+            self._sleep(delay)
+            now = self._clock()
+
+        with self._lock:
+            if self._next is None:
+                # Re-anchored while sleeping
+                self._next = now
+                scheduled = now
+            late = now - scheduled
+            if late >= interval:
+                missed = int(late // interval)
+                self.overruns += 1
+                self.skipped_ticks += missed
+                scheduled += missed * interval
+            jitter = now - scheduled
+            self.ticks += 1
+            self.last_jitter = jitter
+            self.max_jitter = max(self.max_jitter, jitter)
+            self._jitter_sum += jitter
+            self._recent.append(jitter)
+            self._next = scheduled + interval
+        return scheduled
+
+    def stats(self):
+        """Tick counts and start-time jitter in milliseconds (p99 over recent ticks)."""
+        with self._lock:
+            recent = sorted(self._recent)
+            ticks = self.ticks
+            return {
+                'interval': self._interval,
+                'ticks': ticks,
+                'overruns': self.overruns,
+                'skipped_ticks': self.skipped_ticks,
+                'jitter_last_ms': round(self.last_jitter * 1000, 3),
+                'jitter_mean_ms': round(self._jitter_sum / ticks * 1000, 3) if ticks else 0,
+                'jitter_p99_ms': round(recent[int(0.99 * (len(recent) - 1))] * 1000, 3) if recent else 0,
+                'jitter_max_ms': round(self.max_jitter * 1000, 3)
+            }
@@ -0,0 +1,73 @@
+import random
+from collections import deque
+
+import pytest
+
+from indicators import SMMAEngine, calculate_smma
+from pricehistory import PriceHistory
+
+
+def assert_matches(engine, period):
+    expected = calculate_smma(engine.history, period)
+    actual = engine.value(period)
+    if expected is None:
+        assert actual is None
+    else:
+        assert actual == pytest.approx(expected, rel=1e-12, abs=1e-9)
+
+
+@pytest.mark.parametrize('make_history', [lambda n: deque(maxlen=n), PriceHistory])
+@pytest.mark.parametrize('capacity', [1, 5, 30, 300])
+def test_engine_matches_calculate_smma(make_history, capacity):
+    rng = random.Random(capacity)
+    engine = SMMAEngine(make_history(capacity), max_periods=4)
+    periods = [1, 2, 3, 7, 30, 120, 299, 300, 301]
+    price = 100.0
+    # Run well past the capacity so the ring wraps and evicts many times,
+    # and past one resync cycle of the running state
+    for step in range(3 * capacity + 50):
+        price = max(0.05, price + rng.uniform(-2, 2))
+        engine.append(price)
+        if step % 3 == 0:
+            assert_matches(engine, rng.choice(periods))
+    for period in periods:
+        assert_matches(engine, period)
+
+
+def test_period_changes_and_lru_eviction():
+    rng = random.Random(7)
+    engine = SMMAEngine(PriceHistory(200), max_periods=2)
+    for step in range(1000):
+        engine.append(rng.uniform(50, 150))
+        # Cycle through more periods than max_periods, so states are
+        # dropped and rebuilt from the history while it keeps sliding
+        assert_matches(engine, 30 + (step % 5) * 40)
+    assert len(engine._states) <= 2
+
+
+def test_invalidate_after_in_place_rescale():
+    rng = random.Random(11)
+    history = deque(maxlen=50)
+    engine = SMMAEngine(history)
+    for _ in range(120):
+        engine.append(rng.uniform(90, 110))
+    assert_matches(engine, 20)
+
+    for index in range(len(history)):
+        history[index] += 25.0
+    engine.invalidate()
+    assert_matches(engine, 20)
+
+    for _ in range(80):
+        engine.append(rng.uniform(110, 140))
+        assert_matches(engine, 20)
+
+
+def test_short_history_and_invalid_period():
+    engine = SMMAEngine(deque(maxlen=10))
+    assert engine.value(0) is None
+    engine.append(1.0)
+    assert engine.value(3) is None
+    engine.append(2.0)
+    engine.append(3.0)
+    assert engine.value(3) == pytest.approx(2.0)
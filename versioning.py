@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+
+
+class Revisions:
+    """Monotonically increasing revision counters for named state collections.
+
+    Writers ``bump`` a collection whenever it changes; readers build an ETag
+    from the revisions a response depends on, so an unchanged response can be
+    answered with 304 without rebuilding or serializing it. Tags include a
+    per-process boot id so they never match across restarts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._revisions = {}
+        self.boot_id = format(int(time.time() * 1000), 'x')
+
+    def bump(self, *names):
+        """Advance each named collection and return the new revision of the last one."""
+        revision = 0
+        with self._lock:
+            for name in names:
+                revision = self._revisions.get(name, 0) + 1
+                self._revisions[name] = revision
+        return revision
+
+    def get(self, name):
+        with self._lock:
+            return self._revisions.get(name, 0)
+
+    def etag(self, *names):
+        """Opaque tag (unquoted) for the current revisions of ``names``."""
+        with self._lock:
+            parts = [f"{name}.{self._revisions.get(name, 0)}" for name in names]
+        return f"{self.boot_id}-{'-'.join(parts)}"
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._revisions)
+
+
+class SnapshotStore:
+    """Latest precomputed view of the state, JSON-encoded at most once per field selection.
+
+    A producer ``publish``es a complete snapshot (a dict of top-level
+    sections) once per tick. Readers ask for a subset of the sections and get
+    the encoded body together with the snapshot version for their ETag.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._data = None
+        self._revisions = {}
+        self._encoded = {}
+
+    def publish(self, data, revisions=None):
+        """Replace the snapshot; ``revisions`` records the state it was built from."""
+        with self._lock:
+            self._version += 1
+            self._data = data
+            self._revisions = revisions or {}
+            self._encoded = {}
+            return self._version
+
+    def get(self):
+        """Return ``(version, data, revisions)``; data is None before the first publish."""
+        with self._lock:
+            return self._version, self._data, self._revisions
+
+    def encoded(self, fields=None):
+        """Return ``(version, body)`` for the sections in ``fields`` (all when empty)."""
+        with self._lock:
+            if self._data is None:
+                return self._version, None
+            key = tuple(sorted(fields)) if fields else ()
+            body = self._encoded.get(key)
+            if body is None:
+                sections = {name: self._data[name] for name in key if name in self._data} if key else self._data
+                body = json.dumps({'version': self._version, **sections}, default=str, separators=(',', ':'))
+                self._encoded[key] = body
+            return self._version, body